@@ -0,0 +1,93 @@
+"""Purchase throughput benchmark for POST /buy.
+
+Runs the app in-process against SQLite (or SQLDB_URL if set):
+
+    poetry run python performance-tests/bench_buy.py --purchases 2000 --concurrency 20
+
+Besides the throughput it prints the SQL statements sent per purchase,
+the round trips that add up once the database is on another machine.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SQLDB_URL", "sqlite+aiosqlite:///test-data/bench.db")
+
+from httpx import AsyncClient
+from sqlalchemy import event, update
+
+from wallet_app import main, models
+
+
+async def register(client, kind, name):
+    user_info = dict(
+        email=f"{name}@bench.local",
+        username=name,
+        first_name=name,
+        last_name=name,
+        password=name,
+    )
+    await client.post(
+        f"/users/register_{kind}",
+        json={"user_info": user_info, f"{kind}_info": {"name": name}},
+    )
+    response = await client.post("/token", data=dict(username=name, password=name))
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run(purchases: int, concurrency: int):
+    os.makedirs("test-data", exist_ok=True)
+    app = main.create_app()
+    await models.recreate_all()
+
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        merchant = await register(client, "merchant", "merchant")
+        item = await client.post(
+            "/items", json=dict(name="bench", price=1.0), headers=merchant
+        )
+        item_id = item.json()["id"]
+
+        customers = []
+        for i in range(concurrency):
+            customers.append(await register(client, "customer", f"customer{i}"))
+
+        async for session in models.get_session():
+            await session.exec(update(models.DBWallet).values(balance=purchases))
+            await session.commit()
+
+        async def buyer(headers, count):
+            for _ in range(count):
+                response = await client.post(
+                    "/buy", json=dict(item_id=item_id), headers=headers
+                )
+                assert response.status_code == 200, response.text
+
+        statements = 0
+
+        def count(*args):
+            nonlocal statements
+            statements += 1
+
+        per_buyer = purchases // concurrency
+        event.listen(models.engine.sync_engine, "before_cursor_execute", count)
+        started = time.perf_counter()
+        await asyncio.gather(*(buyer(headers, per_buyer) for headers in customers))
+        elapsed = time.perf_counter() - started
+        event.remove(models.engine.sync_engine, "before_cursor_execute", count)
+
+    total = per_buyer * concurrency
+    print(
+        f"{total} purchases in {elapsed:.2f}s: {total / elapsed:.1f} purchases/s, "
+        f"{statements / total:.1f} statements per purchase"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--purchases", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args.purchases, args.concurrency))
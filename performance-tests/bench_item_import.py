@@ -0,0 +1,63 @@
+"""Time POST /items/bulk and PATCH /items/bulk for a large catalog.
+
+    poetry run python performance-tests/bench_item_import.py --items 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import bench_buy
+
+from httpx import AsyncClient
+
+from wallet_app import main, models
+
+
+async def run(items: int, batch_size: int):
+    os.makedirs("test-data", exist_ok=True)
+    app = main.create_app()
+    await models.recreate_all()
+
+    async with AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        headers = await bench_buy.register(client, "merchant", "catalog")
+
+        async def body():
+            for start in range(0, items, 1000):
+                yield "".join(
+                    json.dumps(dict(name=f"item {i}", price=random.randint(1, 100))) + "\n"
+                    for i in range(start, min(start + 1000, items))
+                ).encode()
+
+        started = time.perf_counter()
+        response = await client.post(
+            "/items/bulk",
+            content=body(),
+            params=dict(batch_size=batch_size),
+            headers=headers | {"Content-Type": "application/x-ndjson"},
+        )
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        print(f"imported {response.json()['inserted']} items in {elapsed:.2f}s")
+
+        updates = [dict(id=i, price=random.randint(1, 100)) for i in range(1, 10_001)]
+        started = time.perf_counter()
+        response = await client.patch(
+            "/items/bulk", json=dict(items=updates), headers=headers
+        )
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        print(f"updated {response.json()['updated']} prices in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.batch_size))
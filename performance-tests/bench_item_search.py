@@ -0,0 +1,92 @@
+"""Latency of item search against a large catalog.
+
+Seeds items with generated words straight through the engine (the search
+index is maintained by the database), then times random queries through
+search.search_items:
+
+    poetry run python performance-tests/bench_item_search.py --items 5000000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SQLDB_URL", "sqlite+aiosqlite:///test-data/bench.db")
+
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from wallet_app import config, models, search
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+CHUNK = 50_000
+
+
+def vocabulary(size: int) -> list[str]:
+    words = {"".join(random.choices(LETTERS, k=random.randint(4, 9))) for _ in range(size)}
+    return list(words)
+
+
+async def seed(items: int, words: list[str]):
+    # a few words are common, most are rare
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+    def phrase(k):
+        return " ".join(random.choices(words, cum_weights=weights, k=k))
+
+    async with models.engine.begin() as conn:
+        await conn.execute(
+            insert(models.DBUser),
+            dict(id=1, email="s@bench", username="s", first_name="s", last_name="s",
+                 password="-", role="merchant"),
+        )
+        await conn.execute(insert(models.DBMerchant), dict(id=1, name="s", user_id=1))
+
+        started = time.perf_counter()
+        for start in range(0, items, CHUNK):
+            rows = [
+                dict(name=phrase(2), description=phrase(6), price=1.0, merchant_id=1, user_id=1)
+                for _ in range(min(CHUNK, items - start))
+            ]
+            await conn.execute(insert(models.DBItem), rows)
+        print(f"seeded {items} items in {time.perf_counter() - started:.1f}s")
+
+
+async def run(items: int, queries: int, reuse: bool):
+    os.makedirs("test-data", exist_ok=True)
+    random.seed(1)
+    words = vocabulary(20_000)
+    models.init_db(config.get_settings())
+    if not reuse:
+        await models.recreate_all()
+        await seed(items, words)
+
+    latencies = []
+    async with AsyncSession(models.engine) as session:
+        for _ in range(queries):
+            terms = random.sample(words, random.randint(1, 2))
+            q = " ".join(term[: random.randint(3, len(term))] for term in terms)
+            started = time.perf_counter()
+            await search.search_items(session, q, None, None, 50)
+            latencies.append(time.perf_counter() - started)
+
+    p95 = statistics.quantiles(latencies, n=20)[18] * 1000
+    print(
+        f"{queries} searches: p50={statistics.median(latencies) * 1000:.1f}ms "
+        f"p95={p95:.1f}ms max={max(latencies) * 1000:.1f}ms"
+    )
+    await models.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--reuse", action="store_true", help="search the existing data")
+    args = parser.parse_args()
+    asyncio.run(run(args.items, args.queries, args.reuse))
@@ -0,0 +1,108 @@
+"""ORM instances vs. readers.py rows for list endpoints.
+
+Seeds items, then builds the /items/page/{page}/page_size/{size} response
+body both ways: select(DBItem) + ItemList.from_orm (the old path) and
+readers.fetch_dicts + RowsResponse (the current one). Reports peak memory
+per 10k rows with tracemalloc, and responses per second:
+
+    poetry run python performance-tests/bench_list_reads.py --items 100000 --page-size 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SQLDB_URL", "sqlite+aiosqlite:///test-data/bench.db")
+
+from sqlalchemy import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from wallet_app import config, models, readers, responses
+
+CHUNK = 50_000
+
+
+async def seed(items: int):
+    async with models.engine.begin() as conn:
+        await conn.execute(
+            insert(models.DBUser),
+            dict(id=1, email="l@bench", username="l", first_name="l", last_name="l",
+                 password="-", role="merchant"),
+        )
+        await conn.execute(insert(models.DBMerchant), dict(id=1, name="l", user_id=1))
+        for start in range(0, items, CHUNK):
+            rows = [
+                dict(name=f"item {n}", description="a bench item", price=n % 100 + 0.5,
+                     tax=0.07, merchant_id=1, user_id=1)
+                for n in range(start, min(start + CHUNK, items))
+            ]
+            await conn.execute(insert(models.DBItem), rows)
+
+
+def page(items) -> dict:
+    return dict(items=items, page=1, page_count=1, size_per_page=len(items), next_cursor=None)
+
+
+async def orm_body(session, size: int) -> bytes:
+    result = await session.exec(select(models.DBItem).limit(size))
+    item_list = models.ItemList.from_orm(page(result.all()))
+    return responses.ModelResponse(item_list).body
+
+
+async def rows_body(session, size: int) -> bytes:
+    items = await readers.fetch_dicts(
+        session, readers.select_columns(models.Item, models.DBItem).limit(size)
+    )
+    return responses.RowsResponse(page(items)).body
+
+
+async def measure(name: str, build, size: int, rounds: int):
+    # a fresh session per response, as per request; expunged on close
+    async def once():
+        async with AsyncSession(models.engine) as session:
+            return await build(session, size)
+
+    body = await once()
+
+    tracemalloc.start()
+    await once()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await once()
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{name:5} {peak / size * 10_000 / 2**20:7.1f} MiB per 10k rows  "
+        f"{rounds / elapsed:7.1f} responses/s  ({len(body):,} bytes)"
+    )
+    return body
+
+
+async def run(args):
+    os.makedirs("test-data", exist_ok=True)
+    models.init_db(config.get_settings())
+    if not args.reuse:
+        await models.recreate_all()
+        await seed(args.items)
+
+    orm = await measure("orm", orm_body, args.page_size, args.rounds)
+    rows = await measure("rows", rows_body, args.page_size, args.rounds)
+    assert json.loads(orm) == json.loads(rows)
+    await models.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--reuse", action="store_true", help="read the existing data")
+    asyncio.run(run(parser.parse_args()))
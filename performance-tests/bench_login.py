@@ -0,0 +1,69 @@
+"""Login throughput, and latency of an unrelated route while logins run.
+
+Compare hashing on the event loop with the process pool:
+
+    poetry run python performance-tests/bench_login.py --workers 0
+    poetry run python performance-tests/bench_login.py --workers 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import bench_buy
+
+from httpx import AsyncClient
+
+from wallet_app import main, models, passwords
+
+
+async def run(workers: int, duration: float, concurrency: int):
+    passwords.settings.PASSWORD_HASH_WORKERS = workers
+    os.makedirs("test-data", exist_ok=True)
+    app = main.create_app()
+    await models.recreate_all()
+
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        await bench_buy.register(client, "customer", "login")
+
+        logins = 0
+        latencies = []
+        deadline = time.perf_counter() + duration
+
+        async def login():
+            nonlocal logins
+            while time.perf_counter() < deadline:
+                response = await client.post(
+                    "/token", data=dict(username="login", password="login")
+                )
+                assert response.status_code == 200, response.text
+                logins += 1
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await client.get("/health/db")
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(probe(), *(login() for _ in range(concurrency)))
+
+    passwords.shutdown()
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+    print(
+        f"workers={workers}: {logins / duration:.1f} logins/s, "
+        f"/health/db p50={statistics.median(latencies) * 1000:.1f}ms p99={p99:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.workers, args.duration, args.concurrency))
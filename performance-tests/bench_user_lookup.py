@@ -0,0 +1,91 @@
+"""Login lookup latency against a large users table.
+
+Seeds users straight through the engine with one pre-computed password hash,
+then times the username-or-email query used by POST /token:
+
+    poetry run python performance-tests/bench_user_lookup.py --users 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import case, func, insert, text
+from sqlmodel import select
+
+from wallet_app import config, models, passwords
+
+BATCH = 10_000
+
+
+async def seed(users: int):
+    password = passwords.pwd_context.hash("bench")
+    async with models.engine.begin() as conn:
+        for start in range(0, users, BATCH):
+            rows = [
+                dict(
+                    email=f"user{i}@bench.com",
+                    username=f"user{i}",
+                    first_name="Bench",
+                    last_name="User",
+                    password=password,
+                    role="customer",
+                    status="active",
+                )
+                for i in range(start, min(start + BATCH, users))
+            ]
+            await conn.execute(insert(models.DBUser), rows)
+
+
+def lookup(login: str):
+    return (
+        select(models.DBUser)
+        .where(models.matches_login(login, login))
+        .order_by(case((func.lower(models.DBUser.username) == login, 0), else_=1))
+        .limit(1)
+    )
+
+
+async def run(users: int, lookups: int):
+    os.makedirs("test-data", exist_ok=True)
+    models.init_db(config.get_settings())
+    await models.recreate_all()
+
+    started = time.perf_counter()
+    await seed(users)
+    print(f"seeded {users} users in {time.perf_counter() - started:.1f}s")
+
+    latencies = []
+    async with models.AsyncSession(models.engine) as session:
+        if models.engine.dialect.name == "sqlite":
+            statement = lookup("user1").compile(
+                models.engine, compile_kwargs={"literal_binds": True}
+            )
+            plan = await session.exec(text(f"EXPLAIN QUERY PLAN {statement}"))
+            for row in plan:
+                print("plan:", row[-1])
+
+        for _ in range(lookups):
+            i = random.randrange(users)
+            login = random.choice([f"user{i}", f"USER{i}@bench.com"]).lower()
+            started = time.perf_counter()
+            user = (await session.exec(lookup(login))).first()
+            latencies.append(time.perf_counter() - started)
+            assert user is not None and user.username == f"user{i}"
+
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+    print(
+        f"{lookups} lookups: p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"p99={p99:.2f}ms"
+    )
+    await models.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.lookups))
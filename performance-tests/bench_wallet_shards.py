@@ -0,0 +1,38 @@
+"""Purchase throughput against one hot merchant for different shard counts.
+
+Each run sets WALLET_SHARDS and COUNTER_SHARDS to the same count, as a
+purchase also upserts the counter and sales rollup rows of the merchant.
+
+Shards only help where writers run in parallel, so point SQLDB_URL at
+Postgres for meaningful numbers:
+
+    SQLDB_URL=postgresql+asyncpg://... poetry run python \
+        performance-tests/bench_wallet_shards.py --shards 0 2 4 8 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import bench_buy
+
+from wallet_app import balances, counters
+
+
+async def main(shard_counts: list[int], purchases: int, concurrency: int):
+    for shards in shard_counts:
+        balances.settings.WALLET_SHARDS = shards
+        counters.settings.COUNTER_SHARDS = shards
+        print(f"shards={shards}: ", end="", flush=True)
+        await bench_buy.run(purchases, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 2, 4, 8, 16])
+    parser.add_argument("--purchases", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.shards, args.purchases, args.concurrency))
@@ -0,0 +1,96 @@
+"""Seed the accounts and items the Locust suite logs in with.
+
+Writes straight to SQLDB_URL with one pre-computed password hash, so
+seeding thousands of users does not run thousands of bcrypt rounds:
+
+    poetry run python performance-tests/locust_seed.py --reset
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wallet_app import config, counters, models, passwords
+
+
+PASSWORD = "locust"
+ADMIN = "locust-admin"
+MERCHANTS = 10
+CUSTOMERS = 200
+ITEMS_PER_MERCHANT = 100
+BALANCE = 1_000_000_000.0
+
+
+def merchant_name(i: int) -> str:
+    return f"locust-merchant-{i}"
+
+
+def customer_name(i: int) -> str:
+    return f"locust-customer-{i}"
+
+
+def new_user(username: str, password: str, role: models.UserRole) -> models.DBUser:
+    return models.DBUser(
+        email=f"{username}@locust.local",
+        username=username,
+        first_name="Locust",
+        last_name="User",
+        password=password,
+        role=role,
+    )
+
+
+async def seed(merchants: int, customers: int, items_per_merchant: int, reset: bool):
+    models.init_db(config.get_settings())
+    if reset:
+        await models.recreate_all()
+
+    password = passwords.pwd_context.hash(PASSWORD)
+
+    async with models.AsyncSession(models.engine) as session:
+        session.add(new_user(ADMIN, password, models.UserRole.administrator))
+
+        for i in range(merchants):
+            user = new_user(merchant_name(i), password, models.UserRole.merchant)
+            merchant = models.DBMerchant(name=merchant_name(i), user=user)
+            session.add(models.DBWallet(balance=0.0, user=user))
+            session.add_all(
+                models.DBItem(
+                    name=f"item {i}-{n}",
+                    description="seeded for load tests",
+                    price=float(1 + n % 50),
+                    merchant=merchant,
+                    user=user,
+                )
+                for n in range(items_per_merchant)
+            )
+
+        for i in range(customers):
+            user = new_user(customer_name(i), password, models.UserRole.customer)
+            session.add(models.DBCustomer(name=customer_name(i), user=user))
+            session.add(models.DBWallet(balance=BALANCE, user=user))
+
+        await session.commit()
+        await counters.rebuild(session)
+
+    await models.dispose()
+    print(
+        f"seeded {ADMIN}, {merchants} merchants with {items_per_merchant} items "
+        f"each and {customers} customers (password {PASSWORD!r})"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--merchants", type=int, default=MERCHANTS)
+    parser.add_argument("--customers", type=int, default=CUSTOMERS)
+    parser.add_argument("--items-per-merchant", type=int, default=ITEMS_PER_MERCHANT)
+    parser.add_argument(
+        "--reset", action="store_true", help="drop and recreate all tables first"
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        seed(args.merchants, args.customers, args.items_per_merchant, args.reset)
+    )
@@ -0,0 +1,249 @@
+"""Load profile for the wallet API.
+
+Customers browse and buy, merchants manage their items, and an admin reads
+the listings. Seed the accounts, start the server, then run headless with
+CSV and HTML reports (p50/p95/p99 per route are in *_stats.csv):
+
+    poetry run python performance-tests/locust_seed.py --reset
+    poetry run uvicorn wallet_app.main:create_app --factory --workers 4
+    poetry run locust -f performance-tests/locustfile.py --headless \\
+        --host http://localhost:8000 -u 200 -r 20 -t 5m \\
+        --csv test-data/locust --html test-data/locust.html
+
+Pass the same --seed-merchants/--seed-customers counts used for seeding.
+Simulated users sharing an account also share its tokens: each account
+logs in once and later users reuse the token, refreshing it on 401.
+"""
+import random
+import uuid
+
+from gevent.lock import BoundedSemaphore
+from locust import HttpUser, between, events, task
+
+import locust_seed
+
+
+# username -> token response, shared by every simulated user of that account
+tokens: dict[str, dict] = {}
+token_locks: dict[str, BoundedSemaphore] = {}
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    parser.add_argument(
+        "--seed-merchants", type=int, default=locust_seed.MERCHANTS,
+        help="merchant accounts created by locust_seed.py",
+    )
+    parser.add_argument(
+        "--seed-customers", type=int, default=locust_seed.CUSTOMERS,
+        help="customer accounts created by locust_seed.py",
+    )
+    parser.add_argument(
+        "--register-ratio", type=float, default=0.05,
+        help="share of customers that register a new account instead",
+    )
+
+
+class WalletUser(HttpUser):
+    abstract = True
+    wait_time = between(0.5, 2)
+
+    username: str
+    headers: dict
+
+    def login(self, username: str, password: str = locust_seed.PASSWORD):
+        self.username = username
+        self.password = password
+        with token_locks.setdefault(username, BoundedSemaphore()):
+            if username not in tokens:
+                response = self.client.post(
+                    "/token", data=dict(username=username, password=password)
+                )
+                response.raise_for_status()
+                tokens[username] = response.json()
+        self.use_token()
+
+    def use_token(self):
+        self.headers = {"Authorization": f"Bearer {tokens[self.username]['access_token']}"}
+
+    def refresh(self):
+        """Rotate the shared refresh token once, however many users hit 401."""
+        stale = self.headers
+        with token_locks[self.username]:
+            self.use_token()
+            if self.headers != stale:
+                return
+
+            response = self.client.post(
+                "/token/refresh",
+                json=dict(refresh_token=tokens[self.username]["refresh_token"]),
+            )
+            if response.status_code != 200:
+                response = self.client.post(
+                    "/token",
+                    data=dict(username=self.username, password=self.password),
+                )
+                response.raise_for_status()
+            tokens[self.username] = response.json()
+        self.use_token()
+
+    def request(self, method: str, url: str, name: str | None = None, **kwargs):
+        for _ in range(2):
+            with self.client.request(
+                method, url, name=name, headers=self.headers,
+                catch_response=True, **kwargs,
+            ) as response:
+                if response.status_code != 401:
+                    return response
+                # expired or revoked: not a failure of the route itself
+                response.success()
+            self.refresh()
+        return response
+
+
+class Customer(WalletUser):
+    weight = 8
+
+    def on_start(self):
+        self.item_ids: list[int] = []
+        self.page_count = 1
+
+        options = self.environment.parsed_options
+        if random.random() < options.register_ratio:
+            self.register()
+        else:
+            self.login(locust_seed.customer_name(random.randrange(options.seed_customers)))
+
+    def register(self):
+        name = f"locust-new-{uuid.uuid4().hex[:12]}"
+        user_info = dict(
+            email=f"{name}@locust.local",
+            username=name,
+            first_name="Locust",
+            last_name="Customer",
+            password=name,
+        )
+        self.client.post(
+            "/users/register_customer",
+            json={"user_info": user_info, "customer_info": {"name": name}},
+        ).raise_for_status()
+        self.login(name, name)
+        self.request("PUT", "/wallets/add", json=dict(balance=locust_seed.BALANCE))
+
+    @task(6)
+    def browse_page(self):
+        page = random.randint(1, self.page_count)
+        response = self.request("GET", f"/items/page/{page}", name="/items/page/[page]")
+        if response.ok:
+            body = response.json()
+            self.page_count = max(body["page_count"], 1)
+            self.item_ids = [item["id"] for item in body["items"]] or self.item_ids
+
+    @task(2)
+    def browse_cursor(self):
+        cursor = None
+        for _ in range(3):
+            params = dict(limit=50, sort="price")
+            if cursor:
+                params["cursor"] = cursor
+            response = self.request("GET", "/items", name="/items", params=params)
+            if not response.ok:
+                return
+            cursor = response.json()["next_cursor"]
+            if not cursor:
+                return
+
+    @task(2)
+    def view_item(self):
+        if self.item_ids:
+            item_id = random.choice(self.item_ids)
+            self.request("GET", f"/items/item_id/{item_id}", name="/items/item_id/[id]")
+
+    @task(3)
+    def buy(self):
+        if not self.item_ids:
+            return self.browse_page()
+        self.request("POST", "/buy", json=dict(item_id=random.choice(self.item_ids)))
+
+    @task(1)
+    def buy_cart(self):
+        if not self.item_ids:
+            return self.browse_page()
+        items = random.sample(self.item_ids, min(3, len(self.item_ids)))
+        cart = [dict(item_id=item_id, quantity=random.randint(1, 3)) for item_id in items]
+        self.request("POST", "/buy/batch", json=dict(items=cart))
+
+    @task(1)
+    def me(self):
+        self.request("GET", "/users/me")
+
+
+class Merchant(WalletUser):
+    weight = 2
+
+    def on_start(self):
+        options = self.environment.parsed_options
+        self.login(locust_seed.merchant_name(random.randrange(options.seed_merchants)))
+        self.item_ids: list[int] = []
+        self.merchant_id = None
+        self.create_item()
+
+    @task(1)
+    def create_item(self):
+        response = self.request(
+            "POST", "/items",
+            json=dict(name=f"item {uuid.uuid4().hex[:8]}", price=random.randint(1, 50)),
+        )
+        if response.ok:
+            item = response.json()
+            self.item_ids.append(item["id"])
+            self.merchant_id = item["merchant_id"]
+
+    @task(4)
+    def update_item(self):
+        if not self.item_ids:
+            return self.create_item()
+        item_id = random.choice(self.item_ids)
+        self.request(
+            "PUT", f"/items/{item_id}", name="/items/[id]",
+            json=dict(name=f"item {item_id}", price=random.randint(1, 50)),
+        )
+
+    @task(2)
+    def list_own_items(self):
+        params = dict(limit=50)
+        if self.merchant_id is not None:
+            params["merchant_id"] = self.merchant_id
+        self.request("GET", "/items", name="/items", params=params)
+
+    @task(1)
+    def stats(self):
+        if self.merchant_id is not None:
+            self.request(
+                "GET", f"/merchants/{self.merchant_id}/stats",
+                name="/merchants/[id]/stats",
+            )
+
+
+class AdminReader(WalletUser):
+    weight = 1
+
+    def on_start(self):
+        self.login(locust_seed.ADMIN)
+
+    @task(6)
+    def merchants(self):
+        self.request("GET", "/merchants")
+
+    @task(4)
+    def wallets(self):
+        self.request("GET", "/wallets")
+
+    # reads the whole transactions table, so it stays a rare report
+    @task(1)
+    def transactions_export(self):
+        self.request("GET", "/transactions/export")
+
+    @task(4)
+    def health(self):
+        self.request("GET", "/health/db")
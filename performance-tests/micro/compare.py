@@ -0,0 +1,65 @@
+"""Compare two micro-benchmark result files and flag regressions.
+
+    poetry run python performance-tests/micro/compare.py BASELINE CURRENT --threshold 10
+
+Exits with status 1 if any benchmark's median is more than --threshold
+percent slower than in BASELINE.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float, metric: str) -> list[str]:
+    regressions = []
+    names = sorted(set(baseline["benchmarks"]) | set(current["benchmarks"]))
+
+    print(f"{'benchmark':40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in names:
+        before = baseline["benchmarks"].get(name, {}).get(metric)
+        after = current["benchmarks"].get(name, {}).get(metric)
+        if before is None or after is None:
+            print(f"{name:40} {_us(before):>12} {_us(after):>12} {'n/a':>8}")
+            continue
+
+        change = (after - before) / before * 100
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:40} {_us(before):>12} {_us(after):>12} {change:+7.1f}%{flag}")
+
+    return regressions
+
+
+def _us(value: float | None) -> str:
+    if value is None:
+        return "-"
+    if value >= 1000:
+        return f"{value / 1000:.2f}ms"
+    return f"{value:.1f}us"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument(
+        "--threshold", type=float, default=10, help="allowed slowdown in percent"
+    )
+    parser.add_argument(
+        "--metric", default="median_us", choices=["median_us", "mean_us", "min_us"]
+    )
+    args = parser.parse_args()
+
+    baseline, current = load(args.baseline), load(args.current)
+    print(f"baseline {baseline.get('commit')}  current {current.get('commit')}\n")
+    regressions = compare(baseline, current, args.threshold, args.metric)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than {args.threshold}%")
+        sys.exit(1)
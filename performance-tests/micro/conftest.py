@@ -0,0 +1,140 @@
+"""Micro-benchmarks for per-request CPU cost, run in-process against SQLite.
+
+    poetry run pytest performance-tests/micro --bench-save test-data/benchmarks/main.json
+    # ... change something ...
+    poetry run pytest performance-tests/micro --bench-save test-data/benchmarks/branch.json
+    poetry run python performance-tests/micro/compare.py \\
+        test-data/benchmarks/main.json test-data/benchmarks/branch.json
+
+Each benchmark awaits the ``bench`` fixture once; its timings are written
+to the --bench-save JSON file when the session ends.
+"""
+import asyncio
+import inspect
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import time
+
+os.environ.setdefault("SQLDB_URL", "sqlite+aiosqlite:///test-data/micro.db")
+
+import pytest
+from httpx import AsyncClient
+
+from wallet_app import config, main, models
+
+
+results: dict[str, dict] = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-save",
+        default="test-data/benchmarks/latest.json",
+        help="write benchmark results to this JSON file",
+    )
+    parser.addoption(
+        "--bench-rounds",
+        type=float,
+        default=1.0,
+        help="scale every benchmark's round count, e.g. 0.1 for a smoke run",
+    )
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not results:
+        return
+
+    path = pathlib.Path(session.config.getoption("--bench-save"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(
+            dict(
+                created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                commit=_git_commit(),
+                python=platform.python_version(),
+                machine=platform.machine(),
+                processor=platform.processor(),
+                benchmarks=results,
+            ),
+            indent=2,
+            sort_keys=True,
+        )
+    )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@pytest.fixture
+def bench(request):
+    """Time fn over rounds calls (after warmup calls); fn may be a coroutine function."""
+    scale = request.config.getoption("--bench-rounds")
+
+    async def run(fn, rounds: int = 100, warmup: int = 3):
+        is_async = inspect.iscoroutinefunction(fn)
+        rounds = max(int(rounds * scale), 2)
+
+        for _ in range(warmup):
+            await fn() if is_async else fn()
+
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await fn() if is_async else fn()
+            timings.append(time.perf_counter() - started)
+
+        results[request.node.name] = dict(
+            rounds=rounds,
+            mean_us=statistics.fmean(timings) * 1e6,
+            median_us=statistics.median(timings) * 1e6,
+            min_us=min(timings) * 1e6,
+            stdev_us=statistics.stdev(timings) * 1e6,
+        )
+
+    return run
+
+
+@pytest.fixture(name="app", scope="session")
+def app_fixture():
+    os.makedirs("test-data", exist_ok=True)
+    app = main.create_app(config.Settings())
+    asyncio.run(models.recreate_all())
+    return app
+
+
+@pytest.fixture(name="client", scope="session")
+def client_fixture(app) -> AsyncClient:
+    return AsyncClient(app=app, base_url="http://bench")
+
+
+@pytest.fixture
+def register(client: AsyncClient):
+    return lambda kind, name: register_and_login(client, kind, name)
+
+
+async def register_and_login(client: AsyncClient, kind: str, name: str) -> dict:
+    user_info = dict(
+        email=f"{name}@bench.local",
+        username=name,
+        first_name=name,
+        last_name=name,
+        password=name,
+    )
+    response = await client.post(
+        f"/users/register_{kind}",
+        json={"user_info": user_info, f"{kind}_info": {"name": name}},
+    )
+    assert response.status_code == 200, response.text
+    response = await client.post("/token", data=dict(username=name, password=name))
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
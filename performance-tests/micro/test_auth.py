@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+from sqlmodel import select
+
+from wallet_app import deps, models, passwords, security
+
+
+@pytest.fixture
+def claims() -> dict:
+    return {"sub": "1", "role": "customer", "username": "bench"}
+
+
+@pytest.mark.asyncio
+async def test_jwt_encode(bench, claims):
+    await bench(lambda: security.create_access_token(claims), rounds=5000)
+
+
+@pytest.mark.asyncio
+async def test_jwt_decode(bench, claims):
+    token = security.create_access_token(claims)
+    await bench(lambda: deps.decode_claims(token), rounds=5000)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cached", [False, True], ids=["miss", "hit"])
+async def test_get_current_user(bench, register, monkeypatch, cached):
+    monkeypatch.setattr(deps.settings, "STATELESS_AUTH", False)
+    name = f"current-{cached}"
+    await register("customer", name)
+
+    async with models.AsyncSession(models.engine) as session:
+        user_id = (
+            await session.exec(
+                select(models.DBUser.id).where(models.DBUser.username == name)
+            )
+        ).one()
+        claims = models.TokenClaims(sub=user_id)
+
+        async def current_user():
+            if not cached:
+                deps.user_cache.invalidate(user_id)
+                session.expunge_all()
+            await deps.get_current_user(claims, session)
+
+        await bench(current_user, rounds=2000)
+
+
+@pytest.mark.asyncio
+async def test_bcrypt_verify(bench):
+    hashed = passwords.pwd_context.hash("123456")
+    await bench(lambda: passwords.pwd_context.verify("123456", hashed), rounds=10, warmup=1)
+
+
+@pytest.mark.asyncio
+async def test_register_customer(bench, client):
+    async def register():
+        name = f"reg-{uuid.uuid4().hex[:12]}"
+        user_info = dict(
+            email=f"{name}@bench.local",
+            username=name,
+            first_name=name,
+            last_name=name,
+            password=name,
+        )
+        response = await client.post(
+            "/users/register_customer",
+            json={"user_info": user_info, "customer_info": {"name": name}},
+        )
+        assert response.status_code == 200, response.text
+
+    await bench(register, rounds=10, warmup=1)
@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import update
+
+from wallet_app import models
+
+
+@pytest.mark.asyncio
+async def test_buy_item(bench, client, register):
+    merchant = await register("merchant", "buy-merchant")
+    customer = await register("customer", "buy-customer")
+    response = await client.post(
+        "/items", json=dict(name="bench", price=1.0), headers=merchant
+    )
+    item_id = response.json()["id"]
+
+    async with models.AsyncSession(models.engine) as session:
+        await session.exec(update(models.DBWallet).values(balance=1_000_000))
+        await session.commit()
+
+    async def buy():
+        response = await client.post(
+            "/buy", json=dict(item_id=item_id), headers=customer
+        )
+        assert response.status_code == 200, response.text
+
+    await bench(buy, rounds=300)
@@ -0,0 +1,67 @@
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from wallet_app import models
+from wallet_app.responses import ModelResponse
+
+
+def db_items(count: int) -> list[models.DBItem]:
+    return [
+        models.DBItem(
+            id=i,
+            name=f"item {i}",
+            description="benchmark item",
+            price=float(i % 50),
+            tax=0.07,
+            merchant_id=1,
+            user_id=1,
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", [50, 500])
+async def test_item_from_orm(bench, count):
+    items = db_items(count)
+    await bench(lambda: [models.Item.from_orm(item) for item in items], rounds=200)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", [50, 500])
+async def test_item_list_from_orm(bench, count):
+    items = db_items(count)
+
+    def serialize():
+        models.ItemList.from_orm(
+            dict(items=items, page_count=1, page=1, size_per_page=count)
+        ).model_dump_json()
+
+    await bench(serialize, rounds=200)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", [50, 500, 5000])
+@pytest.mark.parametrize("path", ["validated", "model_response"])
+async def test_item_list_response(bench, count, path):
+    """ItemList rows to response bytes: FastAPI's response_model path vs ModelResponse."""
+    items = db_items(count)
+    field = create_response_field(name="Response", type_=models.ItemList)
+
+    async def validated():
+        item_list = models.ItemList.from_orm(
+            dict(items=items, page_count=1, page=1, size_per_page=count)
+        )
+        content = await serialize_response(field=field, response_content=item_list)
+        JSONResponse(content)
+
+    async def model_response():
+        item_list = models.ItemList.from_orm(
+            dict(items=items, page_count=1, page=1, size_per_page=count)
+        )
+        ModelResponse(item_list)
+
+    rounds = max(20, 20_000 // count)
+    await bench(validated if path == "validated" else model_response, rounds=rounds)
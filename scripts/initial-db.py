@@ -8,4 +8,4 @@ from wallet_app import config, models
 if __name__ == "__main__":
     settings = config.get_settings()
     models.init_db(settings)
-    asyncio.run(models.recreate_table())
\ No newline at end of file
+    asyncio.run(models.recreate_all())
\ No newline at end of file
@@ -0,0 +1,33 @@
+"""Rebuild merchant_daily_stats and merchant_daily_item_stats from transactions.
+
+    poetry run python scripts/rebuild-merchant-stats.py --chunk 50000
+
+Run it once on a database that has transactions from before the rollups
+existed, while no purchases are made.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import time
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from wallet_app import config, merchant_stats, models
+
+
+async def main(args):
+    models.init_db(config.get_settings())
+    started = time.perf_counter()
+    async with AsyncSession(models.engine) as session:
+        await merchant_stats.rebuild(session, args.chunk)
+    await models.dispose()
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk", type=int, default=50_000, help="transaction ids per commit")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,232 @@
+"""Fill the database with generated users, merchants, items and transactions.
+
+    poetry run python scripts/seed-db.py --users 100000 --transactions 10000000
+
+Rows are generated with explicit ids after the current maximum, so an
+existing database can be topped up. They are written in chunks with COPY
+on PostgreSQL (asyncpg) and executemany elsewhere. Every user shares one
+password hash computed up front. Item popularity follows a Zipf-like
+curve, customer activity a Pareto curve, and prices a log-normal
+distribution. Transactions are spread over the last year. Merchant
+wallets hold their sales, and counters and merchant stats are rebuilt.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import asyncio
+import datetime
+import itertools
+import math
+import random
+import time
+
+from sqlalchemy import func, insert, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from wallet_app import config, counters, merchant_stats, models, passwords
+
+
+FIRST_NAMES = ["Anan", "Busaba", "Chai", "Dao", "Ekkachai", "Fah", "Kanya", "Malee", "Niran", "Somchai"]
+LAST_NAMES = ["Boonmee", "Chaiyaporn", "Kaewmanee", "Srisuk", "Thongdee", "Wongsa"]
+PRODUCTS = ["coffee", "noodles", "t-shirt", "phone case", "book", "rice", "tea", "sneakers"]
+
+
+def log_normal(mean: float, sigma: float) -> float:
+    return random.lognormvariate(math.log(mean) - sigma**2 / 2, sigma)
+
+
+async def next_id(conn, table) -> int:
+    return (await conn.scalar(select(func.coalesce(func.max(table.c.id), 0)))) + 1
+
+
+async def write(conn, table, columns: list[str], rows, chunk: int) -> int:
+    """Insert an iterable of tuples in chunks; returns the row count."""
+    rows = iter(rows)
+    total = 0
+    started = time.perf_counter()
+
+    while batch := list(itertools.islice(rows, chunk)):
+        if conn.dialect.driver == "asyncpg":
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                table.name, records=batch, columns=columns
+            )
+        else:
+            await conn.execute(
+                insert(table), [dict(zip(columns, row)) for row in batch]
+            )
+        total += len(batch)
+
+        if total % (chunk * 10) == 0:
+            rate = total / (time.perf_counter() - started)
+            print(f"  {table.name}: {total:,} rows ({rate:,.0f}/s)")
+
+    print(f"{table.name}: {total:,} rows in {time.perf_counter() - started:.1f}s")
+    return total
+
+
+async def reset_sequences(conn, tables):
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        await conn.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT coalesce(max(id), 0) + 1 FROM {table.name}), false)"
+            )
+        )
+
+
+async def seed(args):
+    users = models.DBUser.__table__
+    merchants = models.DBMerchant.__table__
+    customers = models.DBCustomer.__table__
+    wallets = models.DBWallet.__table__
+    items = models.DBItem.__table__
+    transactions = models.DBTransaction.__table__
+
+    password = passwords.pwd_context.hash(args.password)
+    now = datetime.datetime.now()
+    merchant_count = max(1, int(args.users * args.merchant_ratio))
+    customer_count = args.users - merchant_count
+
+    async with models.engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            await conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+        user_id = await next_id(conn, users)
+        merchant_id = await next_id(conn, merchants)
+        customer_id = await next_id(conn, customers)
+        wallet_id = await next_id(conn, wallets)
+        item_id = await next_id(conn, items)
+        transaction_id = await next_id(conn, transactions)
+
+        # users: merchants first, then customers
+        def user_rows():
+            for i in range(args.users):
+                uid = user_id + i
+                role = models.UserRole.merchant if i < merchant_count else models.UserRole.customer
+                registered = now - datetime.timedelta(days=random.uniform(0, 3 * 365))
+                yield (
+                    uid, f"user{uid}@seed.local", f"user{uid}",
+                    random.choice(FIRST_NAMES), random.choice(LAST_NAMES),
+                    password, role.name, "active", registered, registered,
+                )
+
+        await write(
+            conn, users,
+            ["id", "email", "username", "first_name", "last_name", "password",
+             "role", "status", "register_date", "updated_date"],
+            user_rows(), args.chunk,
+        )
+
+        merchant_ids = range(merchant_id, merchant_id + merchant_count)
+        customer_ids = range(customer_id, customer_id + customer_count)
+        await write(
+            conn, merchants, ["id", "name", "user_id"],
+            ((mid, f"Shop {mid}", user_id + i) for i, mid in enumerate(merchant_ids)),
+            args.chunk,
+        )
+        await write(
+            conn, customers, ["id", "name", "user_id"],
+            (
+                (cid, f"Customer {cid}", user_id + merchant_count + i)
+                for i, cid in enumerate(customer_ids)
+            ),
+            args.chunk,
+        )
+
+        # items: a long tail of small shops and a few large ones
+        item_prices: list[float] = []
+        item_merchants: list[int] = []
+        for i, mid in enumerate(merchant_ids):
+            for _ in range(max(1, round(log_normal(args.items_per_merchant, 1.0)))):
+                item_prices.append(round(max(0.5, log_normal(15, 1.0)), 2))
+                item_merchants.append(i)
+
+        await write(
+            conn, items, ["id", "name", "description", "price", "merchant_id", "user_id"],
+            (
+                (
+                    item_id + n, f"{random.choice(PRODUCTS)} {item_id + n}", None,
+                    price, merchant_id + m, user_id + m,
+                )
+                for n, (price, m) in enumerate(zip(item_prices, item_merchants))
+            ),
+            args.chunk,
+        )
+
+        # transactions: popular items and active customers dominate
+        popularity = [1 / (rank + 1) ** 1.1 for rank in range(len(item_prices))]
+        random.shuffle(popularity)
+        item_weights = list(itertools.accumulate(popularity))
+        activity = list(
+            itertools.accumulate(random.paretovariate(1.5) for _ in range(customer_count))
+        )
+        sales = [0.0] * merchant_count
+
+        def transaction_rows():
+            for start in range(0, args.transactions, args.chunk):
+                size = min(args.chunk, args.transactions - start)
+                bought = random.choices(range(len(item_prices)), cum_weights=item_weights, k=size)
+                buyers = random.choices(customer_ids, cum_weights=activity, k=size) if customer_count else [None] * size
+                for n, (i, cid) in enumerate(zip(bought, buyers)):
+                    m = item_merchants[i]
+                    sales[m] += item_prices[i]
+                    yield (
+                        transaction_id + start + n, item_id + i, None,
+                        item_prices[i], merchant_id + m, cid,
+                        now - datetime.timedelta(days=random.uniform(0, 365)),
+                    )
+
+        await write(
+            conn, transactions,
+            ["id", "item_id", "description", "price", "merchant_id", "customer_id",
+             "created_date"],
+            transaction_rows(), args.chunk,
+        )
+
+        # wallets last, so merchant balances can hold their sales
+        def wallet_rows():
+            for i in range(args.users):
+                balance = sales[i] if i < merchant_count else log_normal(500, 1.5)
+                yield (wallet_id + i, round(balance, 2), user_id + i)
+
+        await write(conn, wallets, ["id", "balance", "user_id"], wallet_rows(), args.chunk)
+
+        await reset_sequences(conn, [users, merchants, customers, wallets, items, transactions])
+
+    async with AsyncSession(models.engine) as session:
+        await counters.rebuild(session)
+        await merchant_stats.rebuild(session, args.chunk)
+
+
+async def main(args):
+    random.seed(args.seed)
+    models.init_db(config.get_settings())
+    if args.reset:
+        await models.recreate_all()
+
+    started = time.perf_counter()
+    await seed(args)
+    await models.dispose()
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument(
+        "--merchant-ratio", type=float, default=0.05, help="share of users that are merchants"
+    )
+    parser.add_argument(
+        "--items-per-merchant", type=float, default=20, help="mean, log-normally distributed"
+    )
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=50_000, help="rows per insert")
+    parser.add_argument("--password", default="password", help="password of every user")
+    parser.add_argument("--seed", type=int, default=None, help="random seed")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    asyncio.run(main(parser.parse_args()))
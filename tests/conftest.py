@@ -31,7 +31,7 @@ def app_fixture():
 
     app = main.create_app(settings)
 
-    asyncio.run(models.recreate_table())
+    asyncio.run(models.recreate_all())
 
     yield app
 
@@ -61,11 +61,48 @@ async def example_user1(session: models.AsyncSession) -> models.DBUser:
         email="test@test.com",
         first_name="Firstname",
         last_name="lastname",
+        role=models.UserRole.merchant,
     )
     local_session = await anext(session)
 
-    user.set_password(password)
+    await user.set_password(password)
     local_session.add(user)
     await local_session.commit()
     await local_session.refresh(user)
     return user
+
+
+async def register_and_login(client: AsyncClient, kind: str, name: str) -> dict:
+    user_info = dict(
+        email=f"{name}@test.com",
+        username=name,
+        first_name="Firstname",
+        last_name="Lastname",
+        password="123456",
+    )
+    await client.post(
+        f"/users/register_{kind}",
+        json={"user_info": user_info, f"{kind}_info": {"name": name}},
+    )
+    response = await client.post(
+        "/token", data=dict(username=name, password="123456")
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest_asyncio.fixture(name="customer_headers")
+async def customer_headers_fixture(client: AsyncClient) -> dict:
+    return await register_and_login(client, "customer", "customer1")
+
+
+@pytest_asyncio.fixture(name="merchant_headers")
+async def merchant_headers_fixture(client: AsyncClient) -> dict:
+    return await register_and_login(client, "merchant", "merchant1")
+
+
+@pytest.fixture(name="register")
+def register_fixture(client: AsyncClient):
+    async def register(kind: str, name: str) -> dict:
+        return await register_and_login(client, kind, name)
+
+    return register
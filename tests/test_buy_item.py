@@ -0,0 +1,173 @@
+import asyncio
+
+from fastapi import HTTPException
+from httpx import AsyncClient
+import pytest
+
+from wallet_app import group_commit, models
+from wallet_app.routers import buy_items
+
+
+@pytest.mark.asyncio
+async def test_buy_batch(
+    client: AsyncClient, merchant_headers: dict, customer_headers: dict
+):
+    item_ids = []
+    for name, price in (("pen", 10.0), ("ink", 5.0)):
+        response = await client.post(
+            "/items", json={"name": name, "price": price}, headers=merchant_headers
+        )
+        item_ids.append(response.json()["id"])
+
+    response = await client.put(
+        "/wallets/add", json={"balance": 100.0}, headers=customer_headers
+    )
+    balance = response.json()["balance"]
+
+    cart = {
+        "items": [
+            {"item_id": item_ids[0], "quantity": 2},
+            {"item_id": item_ids[1]},
+            {"item_id": item_ids[0]},
+        ]
+    }
+    response = await client.post("/buy/batch", json=cart, headers=customer_headers)
+
+    assert response.status_code == 200
+    transactions = response.json()["transactions"]
+    assert len(transactions) == 4
+    assert sum(transaction["price"] for transaction in transactions) == 35.0
+
+    response = await client.put(
+        "/wallets/sub", json={"balance": balance - 35.0}, headers=customer_headers
+    )
+    assert response.json()["balance"] == 0.0
+
+    response = await client.post("/buy/batch", json=cart, headers=customer_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_buy_batch_from_own_wallet_rejected(client: AsyncClient, register):
+    headers = await register("merchant", "selfbuyer")
+    response = await client.post(
+        "/items", json={"name": "own pen", "price": 1.0}, headers=headers
+    )
+    item = response.json()
+
+    # a merchant who is also a customer pays from the wallet it sells into
+    async with models.AsyncSession(models.engine) as session:
+        merchant = await session.get(models.DBMerchant, item["merchant_id"])
+        session.add(models.DBCustomer(name="selfbuyer", user_id=merchant.user_id))
+        await session.commit()
+    await client.put("/wallets/add", json={"balance": 10.0}, headers=headers)
+
+    response = await client.post(
+        "/buy/batch", json={"items": [{"item_id": item["id"]}]}, headers=headers
+    )
+    assert response.status_code == 400
+    response = await client.post("/buy", json={"item_id": item["id"]}, headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_buy_group_commit(
+    client: AsyncClient,
+    merchant_headers: dict,
+    register,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(buy_items.settings, "PURCHASE_GROUP_COMMIT", True)
+
+    response = await client.post(
+        "/items", json={"name": "batched", "price": 2.0}, headers=merchant_headers
+    )
+    item_id = response.json()["id"]
+
+    rich = await register("customer", "rich")
+    poor = await register("customer", "poor")
+    await client.put("/wallets/add", json={"balance": 10.0}, headers=rich)
+    response = await client.put(
+        "/wallets/add", json={"balance": 1.0}, headers=merchant_headers
+    )
+    merchant_balance = response.json()["balance"]
+
+    responses = await asyncio.gather(
+        *(
+            client.post("/buy", json={"item_id": item_id}, headers=headers)
+            for headers in [rich, poor] * 5
+        )
+    )
+
+    assert [response.status_code for response in responses] == [200, 400] * 5
+    response = await client.put("/wallets/add", json={"balance": 1.0}, headers=rich)
+    assert response.json()["balance"] == 1.0
+
+    # failed purchases rolled back their savepoint, merchant credit included
+    response = await client.put(
+        "/wallets/add", json={"balance": 1.0}, headers=merchant_headers
+    )
+    assert response.json()["balance"] == merchant_balance + 11.0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_purchases_cannot_overdraw(
+    client: AsyncClient, merchant_headers: dict, register
+):
+    customer = await register("customer", "overdrawer")
+    response = await client.post(
+        "/items", json={"name": "scarce", "price": 1.0}, headers=merchant_headers
+    )
+    item_id = response.json()["id"]
+    response = await client.put("/wallets/add", json={"balance": 10.0}, headers=customer)
+    assert response.json()["balance"] == 10.0
+
+    # SQLite serializes writers, keep the in-flight requests within its busy timeout
+    in_flight = asyncio.Semaphore(10)
+
+    async def buy():
+        async with in_flight:
+            return await client.post("/buy", json={"item_id": item_id}, headers=customer)
+
+    responses = await asyncio.gather(*(buy() for _ in range(30)))
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200] * 10 + [400] * 20
+
+    response = await client.put("/wallets/sub", json={"balance": 0.01}, headers=customer)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_group_commit_failures_resolve_every_caller(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    def no_session(*args, **kwargs):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(group_commit.models, "AsyncSession", no_session)
+    batcher = group_commit.PurchaseBatcher(max_batch=2, window=0.001)
+    purchase = models.CreatedTransaction(item_id=1)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(
+            batcher.submit(1, purchase), batcher.submit(2, purchase),
+            return_exceptions=True,
+        ),
+        timeout=5,
+    )
+    assert [str(result) for result in results] == ["database is down"] * 2
+    monkeypatch.undo()
+
+    async def stuck(*args):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(group_commit.purchases, "purchase", stuck)
+    submitted = asyncio.ensure_future(batcher.submit(1, purchase))
+    while not batcher.flushes:
+        await asyncio.sleep(0.01)
+    for task in batcher.flushes:
+        task.cancel()
+
+    with pytest.raises(HTTPException) as raised:
+        await asyncio.wait_for(submitted, timeout=5)
+    assert raised.value.status_code == 503
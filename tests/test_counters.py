@@ -0,0 +1,78 @@
+from httpx import AsyncClient
+from sqlmodel import select
+import pytest
+
+from wallet_app import counters, models
+
+
+async def item_counts(merchant_id: int) -> tuple[int, int]:
+    async with models.AsyncSession(models.engine) as session:
+        return (
+            await counters.get_count(session, counters.ITEMS, approximate=False),
+            await counters.get_count(
+                session, counters.ITEMS, merchant_id, approximate=False
+            ),
+        )
+
+
+@pytest.mark.asyncio
+async def test_item_counters_follow_writes(client: AsyncClient, register):
+    headers = await register("merchant", "counted")
+    item_ids = []
+    for name in ("one", "two", "three"):
+        response = await client.post(
+            "/items", json={"name": name, "price": 1}, headers=headers
+        )
+        item_ids.append(response.json()["id"])
+    merchant_id = response.json()["merchant_id"]
+
+    total, own = await item_counts(merchant_id)
+    assert own == 3
+
+    response = await client.delete(f"/items/{item_ids[0]}", headers=headers)
+    assert response.status_code == 200
+    assert await item_counts(merchant_id) == (total - 1, 2)
+
+    response = await client.delete(f"/merchants/{merchant_id}", headers=headers)
+    assert response.status_code == 200
+    assert await item_counts(merchant_id) == (total - 3, 0)
+
+
+@pytest.mark.asyncio
+async def test_exact_count_does_not_fill_cache(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(counters.settings, "COUNTER_CACHE_TTL", 60)
+    counters._cache.clear()
+
+    async with models.AsyncSession(models.engine) as session:
+        await counters.get_count(session, counters.ITEMS, approximate=False)
+        assert counters._cache == {}
+        await counters.get_count(session, counters.ITEMS)
+        assert (counters.ITEMS, counters.GLOBAL_SCOPE) in counters._cache
+    counters._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_sharded_counters_sum_their_rows(
+    client: AsyncClient, register, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(counters.settings, "COUNTER_SHARDS", 4)
+    headers = await register("merchant", "striped")
+    for number in range(8):
+        response = await client.post(
+            "/items", json={"name": f"striped {number}", "price": 1}, headers=headers
+        )
+    merchant_id = response.json()["merchant_id"]
+
+    assert (await item_counts(merchant_id))[1] == 8
+    async with models.AsyncSession(models.engine) as session:
+        result = await session.exec(
+            select(models.DBCounter.shard).where(
+                models.DBCounter.name == counters.ITEMS,
+                models.DBCounter.scope_id == merchant_id,
+            )
+        )
+        assert set(result.all()) <= set(range(4))
+
+    response = await client.delete(f"/merchants/{merchant_id}", headers=headers)
+    assert response.status_code == 200
+    assert (await item_counts(merchant_id))[1] == 0
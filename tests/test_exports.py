@@ -0,0 +1,46 @@
+import csv
+import io
+import json
+
+from httpx import AsyncClient
+import pytest
+
+from wallet_app import exports, models
+
+
+@pytest.mark.asyncio
+async def test_export_merchants(client: AsyncClient, register):
+    await register("merchant", "exported")
+
+    response = await client.get("/merchants/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert "exported" in [row["name"] for row in rows]
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+
+    response = await client.get("/merchants/export", params={"format": "csv"})
+    assert response.headers["content-disposition"].endswith('merchants.csv"')
+    table = list(csv.reader(io.StringIO(response.text)))
+    assert table[0] == list(models.Merchant.model_fields)
+    assert len(table) == len(rows) + 1
+
+
+@pytest.mark.asyncio
+async def test_export_returns_connection_when_abandoned(
+    client: AsyncClient, register, monkeypatch: pytest.MonkeyPatch
+):
+    for n in range(3):
+        await register("merchant", f"abandoned{n}")
+    monkeypatch.setattr(exports, "CHUNK_SIZE", 1)
+    checked_out = models.engine.pool.checkedout()
+
+    body = exports._ndjson(
+        exports.select(models.DBMerchant.id).order_by(models.DBMerchant.id)
+    )
+    await anext(body)
+    assert models.engine.pool.checkedout() == checked_out + 1
+
+    # what the server does when the client disconnects
+    await body.aclose()
+    assert models.engine.pool.checkedout() == checked_out
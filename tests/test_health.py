@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+from httpx import AsyncClient
+import pytest
+
+from wallet_app import config, main, models
+
+
+@pytest.mark.asyncio
+async def test_database_health(client: AsyncClient):
+    response = await client.get("/health/db")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+    assert set(response.json()["pool"]) == {
+        "size",
+        "checked_in",
+        "checked_out",
+        "overflow",
+    }
+
+
+def test_lifespan_warms_in_memory_database(monkeypatch: pytest.MonkeyPatch):
+    # create_app() replaces the shared engines; put them back afterwards
+    monkeypatch.setattr(models, "engine", models.engine)
+    monkeypatch.setattr(models, "replica_engines", models.replica_engines)
+
+    settings = config.Settings(
+        SQLDB_URL="sqlite+aiosqlite:///:memory:", SQLDB_POOL_WARMUP=3
+    )
+    with TestClient(main.create_app(settings)) as client:
+        client.portal.call(models.recreate_all)
+
+        response = client.get("/health/db")
+        assert response.status_code == 200
+        assert response.json()["pool"] is None
+
+        # the tables created above are still there on the next connection
+        response = client.get("/merchants")
+        assert response.status_code == 200
+        assert response.json()["merchants"] == []
+
+
+@pytest.mark.asyncio
+async def test_database_health_hides_error(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    async def unreachable():
+        raise OSError("could not connect to postgres://admin:secret@db:5432")
+
+    monkeypatch.setattr(models, "database_health", unreachable)
+    response = await client.get("/health/db")
+
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Database unavailable"
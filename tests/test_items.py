@@ -0,0 +1,289 @@
+import datetime
+import email.utils
+
+from httpx import AsyncClient
+import pytest
+
+from wallet_app import item_cache, models, search
+
+
+@pytest.mark.asyncio
+async def test_import_items_ndjson(client: AsyncClient, register):
+    headers = await register("merchant", "importer")
+    body = "\n".join(
+        [
+            '{"name": "pen", "price": 1.5}',
+            '{"name": "ink", "price": "cheap"}',
+            "not json",
+            '{"name": "paper", "price": 3, "tax": 0.07}',
+        ]
+    )
+
+    response = await client.post(
+        "/items/bulk",
+        content=body,
+        params={"batch_size": 1},
+        headers=headers | {"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 2
+    assert result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [2, 3]
+    assert result["errors"][0]["error"].startswith("price:")
+
+
+@pytest.mark.asyncio
+async def test_import_items_csv_and_update_prices(client: AsyncClient, register):
+    headers = await register("merchant", "csvimporter")
+    body = 'name,description,price,tax\nmug,"tall,\nblue",4.5,\nbowl,,x,\nplate,,2,0.1\n'
+
+    response = await client.post(
+        "/items/bulk",
+        content=body,
+        headers=headers | {"Content-Type": "text/csv"},
+    )
+    result = response.json()
+    assert result["inserted"] == 2
+    assert result["errors"][0]["line"] == 4
+
+    response = await client.post(
+        "/items", json={"name": "cup", "price": 1}, headers=headers
+    )
+    merchant_id = response.json()["merchant_id"]
+    items = (
+        await client.get("/items", params={"merchant_id": merchant_id})
+    ).json()["items"]
+    assert items[0]["description"] == "tall,\nblue"
+    assert items[0]["tax"] is None
+
+    other = await register("merchant", "csvother")
+    others_item = (
+        await client.post("/items", json={"name": "x", "price": 1}, headers=other)
+    ).json()["id"]
+
+    updates = [
+        {"id": items[0]["id"], "price": 5.0},
+        {"id": items[1]["id"], "tax": 0.2},
+        {"id": others_item, "price": 0},
+    ]
+    response = await client.patch(
+        "/items/bulk", json={"items": updates}, headers=headers
+    )
+    assert response.json() == {"updated": 2, "not_found": [others_item]}
+
+    items = (
+        await client.get("/items", params={"merchant_id": merchant_id})
+    ).json()["items"]
+    assert (items[0]["price"], items[0]["tax"]) == (5.0, None)
+    assert (items[1]["price"], items[1]["tax"]) == (2.0, 0.2)
+
+
+@pytest.mark.asyncio
+async def test_search_items(
+    client: AsyncClient, register, monkeypatch: pytest.MonkeyPatch
+):
+    headers = await register("merchant", "searcher")
+    body = "\n".join(
+        [
+            '{"name": "Zephyr kettle", "description": "steel"}',
+            '{"name": "zephyrine teapot", "description": "a zephyr for tea"}',
+            '{"name": "plain mug", "description": "zephyr-free"}',
+        ]
+    )
+    await client.post("/items/bulk", content=body, headers=headers)
+
+    response = await client.get("/items/search", params={"q": "zephyr", "limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["name"] for item in page["items"]] == [
+        "Zephyr kettle",
+        "zephyrine teapot",
+    ]
+    assert set(page) == set(models.ItemList.model_fields)
+    assert (page["page"], page["page_count"], page["truncated"]) == (None, None, False)
+
+    response = await client.get(
+        "/items/search",
+        params={"q": "zephyr", "limit": 2, "cursor": page["next_cursor"]},
+    )
+    page = response.json()
+    assert [item["name"] for item in page["items"]] == ["plain mug"]
+    assert page["next_cursor"] is None
+
+    # only the newest candidates are ranked, and the list says so
+    monkeypatch.setattr(search.settings, "SEARCH_CANDIDATES", 2)
+    response = await client.get("/items/search", params={"q": "zephyr"})
+    assert len(response.json()["items"]) == 2
+    assert response.json()["truncated"] is True
+    monkeypatch.undo()
+
+    response = await client.get("/items/search", params={"q": "zeph TEA"})
+    assert [item["name"] for item in response.json()["items"]] == ["zephyrine teapot"]
+
+    merchant_id = page["items"][0]["merchant_id"]
+    response = await client.get(
+        "/items/search", params={"q": "zephyr", "merchant_id": merchant_id + 1}
+    )
+    assert response.json()["items"] == []
+
+    await client.put(
+        f"/items/{page['items'][0]['id']}",
+        json={"name": "plain cup", "price": 1},
+        headers=headers,
+    )
+    response = await client.get("/items/search", params={"q": "zephyr"})
+    assert len(response.json()["items"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_read_item_cache_and_etag(client: AsyncClient, register):
+    headers = await register("merchant", "cacher")
+    response = await client.post(
+        "/items", json={"name": "lamp", "price": 10}, headers=headers
+    )
+    item_id = response.json()["id"]
+
+    response = await client.get(f"/items/item_id/{item_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "lamp"
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    hits = item_cache.cache.hits
+    response = await client.get(
+        f"/items/item_id/{item_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert item_cache.cache.hits == hits + 1
+    # Last-Modified is cut to the second, so only a later date is trusted
+    response = await client.get(
+        f"/items/item_id/{item_id}", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 200
+    later = email.utils.parsedate_to_datetime(last_modified) + datetime.timedelta(
+        seconds=1
+    )
+    response = await client.get(
+        f"/items/item_id/{item_id}",
+        headers={"If-Modified-Since": email.utils.format_datetime(later, usegmt=True)},
+    )
+    assert response.status_code == 304
+
+    await client.put(
+        f"/items/{item_id}", json={"name": "lamp", "price": 12}, headers=headers
+    )
+    response = await client.get(
+        f"/items/item_id/{item_id}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["price"] == 12
+    assert response.headers["etag"] != etag
+
+    await client.delete(f"/items/{item_id}", headers=headers)
+    response = await client.get(f"/items/item_id/{item_id}")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_deleting_merchant_drops_cached_items(client: AsyncClient, register):
+    headers = await register("merchant", "closing")
+    response = await client.post(
+        "/items", json={"name": "last lamp", "price": 10}, headers=headers
+    )
+    item = response.json()
+    assert (await client.get(f"/items/item_id/{item['id']}")).status_code == 200
+    assert item_cache.cache.get(item["id"]) is not None
+
+    response = await client.delete(
+        f"/merchants/{item['merchant_id']}", headers=headers
+    )
+    assert response.status_code == 200
+    assert (await client.get(f"/items/item_id/{item['id']}")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_item_lists_match_item_schema(client: AsyncClient, register):
+    headers = await register("merchant", "lister")
+    created = []
+    for price in (3, 1, 2):
+        response = await client.post(
+            "/items", json={"name": f"list {price}", "price": price}, headers=headers
+        )
+        created.append(response.json())
+    merchant_id = created[0]["merchant_id"]
+
+    response = await client.get(
+        "/items", params={"merchant_id": merchant_id, "sort": "price", "limit": 2}
+    )
+    assert response.headers["content-type"] == "application/json"
+    page = response.json()
+    assert set(page) == set(models.ItemList.model_fields)
+    assert page["items"] == sorted(created, key=lambda item: item["price"])[:2]
+
+    page = (
+        await client.get(
+            "/items",
+            params={
+                "merchant_id": merchant_id,
+                "sort": "price",
+                "limit": 2,
+                "cursor": page["next_cursor"],
+            },
+        )
+    ).json()
+    assert page["items"] == [created[0]]
+    assert page["next_cursor"] is None
+
+    page = (await client.get("/items/page/1/page_size/1000")).json()
+    assert all(item in page["items"] for item in created)
+    assert set(page) == set(models.ItemList.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_list_items_cursor_walk_and_filters(client: AsyncClient, register):
+    headers = await register("merchant", "walker")
+    prices = [5, 1, 3, 1, 4]
+    for n, price in enumerate(prices):
+        response = await client.post(
+            "/items", json={"name": f"walk {n}", "price": price}, headers=headers
+        )
+    merchant_id = response.json()["merchant_id"]
+
+    seen, cursor = [], None
+    while True:
+        params = {"merchant_id": merchant_id, "sort": "price", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = (await client.get("/items", params=params)).json()
+        assert set(page) == set(models.ItemList.model_fields)
+        assert page["page"] is None
+        assert page["page_count"] == 3
+        seen += [(item["price"], item["id"]) for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == sorted(seen)
+    assert [price for price, _ in seen] == sorted(prices)
+
+    response = await client.get(
+        "/items", params={"merchant_id": merchant_id, "min_price": 2, "max_price": 4}
+    )
+    page = response.json()
+    assert sorted(item["price"] for item in page["items"]) == [3, 4]
+    assert set(page) == set(models.ItemList.model_fields)
+    assert (page["page_count"], page["truncated"]) == (None, False)
+
+
+@pytest.mark.asyncio
+async def test_list_items_rejects_bad_cursor(client: AsyncClient):
+    from wallet_app import pagination
+
+    for cursor in (
+        "not a cursor",
+        pagination.encode_cursor("price", "cheap", 1),
+        pagination.encode_cursor("price", 1.0, "1"),
+        pagination.encode_cursor("id", 1, 1),
+    ):
+        response = await client.get("/items", params={"sort": "price", "cursor": cursor})
+        assert response.status_code == 400, cursor
@@ -1,12 +1,19 @@
+import datetime
+
 from httpx import AsyncClient
-from wallet_app import models
+from wallet_app import merchant_stats, models
 import pytest
 
 
 @pytest.mark.asyncio
 async def test_create_merchants(client: AsyncClient, user1: models.DBUser):
+    token = await client.post(
+        "/token", data={"username": user1.username, "password": "123456"}
+    )
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
     payload = {"name": "merchants", "user_id": user1.id}
-    response = await client.post("/merchants", json=payload)
+    response = await client.post("/merchants", json=payload, headers=headers)
 
     assert response.status_code == 200
 
@@ -16,3 +23,87 @@ async def test_merchants(client: AsyncClient):
     response = await client.get("/merchants")
 
     assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_merchant_stats(
+    client: AsyncClient, register, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(merchant_stats.counters.settings, "COUNTER_SHARDS", 4)
+    headers = await register("merchant", "statsshop")
+    customer = await register("customer", "statsbuyer")
+    item_ids = []
+    for name, price in (("tea", 2.0), ("cake", 5.0)):
+        response = await client.post(
+            "/items", json={"name": name, "price": price}, headers=headers
+        )
+        item_ids.append(response.json()["id"])
+    merchant_id = response.json()["merchant_id"]
+
+    await client.put("/wallets/add", json={"balance": 100.0}, headers=customer)
+    await client.post("/buy", json={"item_id": item_ids[0]}, headers=customer)
+    cart = {"items": [{"item_id": item_ids[0], "quantity": 2}, {"item_id": item_ids[1]}]}
+    response = await client.post("/buy/batch", json=cart, headers=customer)
+    assert response.status_code == 200
+
+    response = await client.get(f"/merchants/{merchant_id}/stats", headers=headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert (stats["orders"], stats["revenue"]) == (4, 11.0)
+    assert len(stats["days"]) == 1
+    top_items = stats["days"][0]["top_items"]
+    assert [item["item_id"] for item in top_items] == [item_ids[0], item_ids[1]]
+    assert top_items[0] == {"item_id": item_ids[0], "orders": 3, "revenue": 6.0}
+
+    async with models.AsyncSession(models.engine) as session:
+        await merchant_stats.rebuild(session, chunk=2)
+    rebuilt = await client.get(f"/merchants/{merchant_id}/stats", headers=headers)
+    assert rebuilt.json() == stats
+
+    response = await client.get(
+        f"/merchants/{merchant_id}/stats",
+        params={"from": "2020-01-01", "to": "2020-01-31", "top": 1},
+        headers=headers,
+    )
+    assert response.json()["days"] == []
+
+    response = await client.get(f"/merchants/{merchant_id}/stats", headers=customer)
+    assert response.status_code == 403
+
+    # moving a sale to another item moves it in the rollups too
+    response = await client.get("/transactions")
+    transaction_id = next(
+        transaction["id"]
+        for transaction in response.json()["transactions"]
+        if transaction["item_id"] == item_ids[0]
+    )
+    response = await client.put(
+        f"/transactions/{transaction_id}", json={"item_id": item_ids[1]}
+    )
+    assert response.status_code == 200
+    response = await client.get(f"/merchants/{merchant_id}/stats", headers=headers)
+    top_items = response.json()["days"][0]["top_items"]
+    assert top_items == [
+        {"item_id": item_ids[1], "orders": 2, "revenue": 7.0},
+        {"item_id": item_ids[0], "orders": 2, "revenue": 4.0},
+    ]
+    async with models.AsyncSession(models.engine) as session:
+        await merchant_stats.rebuild(session, chunk=2)
+    rebuilt = await client.get(f"/merchants/{merchant_id}/stats", headers=headers)
+    assert rebuilt.json() == response.json()
+
+    # taking every sale back leaves no empty day behind
+    day = datetime.date.fromisoformat(stats["days"][0]["day"])
+    async with models.AsyncSession(models.engine) as session:
+        await merchant_stats.track(
+            session,
+            day,
+            [
+                (merchant_id, item_ids[0], 2.0, -2),
+                (merchant_id, item_ids[1], 2.0, -1),
+                (merchant_id, item_ids[1], 5.0, -1),
+            ],
+        )
+        await session.commit()
+    response = await client.get(f"/merchants/{merchant_id}/stats", headers=headers)
+    assert (response.json()["orders"], response.json()["days"]) == (0, [])
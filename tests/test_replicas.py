@@ -0,0 +1,38 @@
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+import pytest
+
+from wallet_app import models
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica(client: AsyncClient, monkeypatch: pytest.MonkeyPatch):
+    replica_engine = create_async_engine("sqlite+aiosqlite:///test-data/replica.db")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(SQLModel.metadata.create_all)
+    async with models.AsyncSession(replica_engine) as session:
+        session.add(models.DBMerchant(name="replica only", user_id=1))
+        await session.commit()
+
+    monkeypatch.setattr(models, "replica_engines", [replica_engine])
+    response = await client.get("/merchants")
+
+    assert [merchant["name"] for merchant in response.json()["merchants"]] == [
+        "replica only"
+    ]
+    await replica_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_replica_falls_back_to_primary(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    replica_engine = create_async_engine("sqlite+aiosqlite:///missing-dir/replica.db")
+    monkeypatch.setattr(models, "replica_engines", [replica_engine])
+
+    response = await client.get("/merchants")
+
+    assert response.status_code == 200
+    assert models.read_engine() is models.engine
@@ -0,0 +1,298 @@
+import datetime
+from httpx import AsyncClient
+from passlib.hash import bcrypt
+from sqlmodel import select
+import jwt
+import pytest
+
+from wallet_app import deps, login_activity, models, security
+
+from conftest import register_and_login
+
+
+@pytest.mark.asyncio
+async def test_current_user_cache(
+    client: AsyncClient, register, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(deps.settings, "STATELESS_AUTH", False)
+    headers = await register("customer", "cached")
+
+    response = await client.get("/users/me", headers=headers)
+    user_id = response.json()["id"]
+    hits = deps.user_cache.hits
+
+    response = await client.get("/users/me", headers=headers)
+    assert response.status_code == 200
+    assert deps.user_cache.hits == hits + 1
+
+    response = await client.put(
+        "/users/change_password",
+        json={"current_password": "123456", "new_password": "654321"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert user_id not in deps.user_cache.entries
+
+    response = await client.get("/health/user-cache")
+    assert response.json()["users"]["hits"] == deps.user_cache.hits
+
+
+@pytest.mark.asyncio
+async def test_stateless_token_and_revoke(
+    client: AsyncClient, register, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(deps.settings, "STATELESS_AUTH", True)
+    headers = await register("merchant", "stateless")
+
+    # /users/me returns every field, so it still loads the user
+    response = await client.get("/users/me", headers=headers)
+    assert response.status_code == 200
+    user_id = response.json()["id"]
+
+    claims = deps.decode_claims(headers["Authorization"].removeprefix("Bearer "))
+    assert claims.role == "merchant"
+    assert "stateless" not in jwt.decode(
+        headers["Authorization"].removeprefix("Bearer "),
+        options={"verify_signature": False},
+    ).values()
+
+    misses = deps.user_cache.misses
+    response = await client.get(f"/users/{user_id}", headers=headers)
+    assert response.status_code == 200
+    assert deps.user_cache.misses == misses
+
+    response = await client.post("/token/revoke", headers=headers)
+    assert response.status_code == 200
+
+    response = await client.get(f"/users/{user_id}", headers=headers)
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_revoke_token_without_jti(client: AsyncClient, register):
+    headers = await register("customer", "nojti")
+    token = headers["Authorization"].removeprefix("Bearer ")
+    payload = jwt.decode(token, options={"verify_signature": False})
+    del payload["jti"]
+    token = jwt.encode(payload, deps.settings.SECRET_KEY, algorithm=security.ALGORITHM)
+
+    response = await client.post(
+        "/token/revoke", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_password_and_status_changes_end_stateless_tokens(
+    client: AsyncClient, register, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(deps.settings, "STATELESS_AUTH", True)
+    headers = await register("customer", "changing")
+    other_device = await register_and_login(client, "customer", "changing")
+    user_id = (await client.get("/users/me", headers=headers)).json()["id"]
+
+    response = await client.put(
+        "/users/change_password",
+        json={"current_password": "123456", "new_password": "654321"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    for old in (headers, other_device):
+        assert (await client.get(f"/users/{user_id}", headers=old)).status_code == 401
+
+    response = await client.post(
+        "/token", data={"username": "changing", "password": "654321"}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    refresh_token = response.json()["refresh_token"]
+    assert (await client.get(f"/users/{user_id}", headers=headers)).status_code == 200
+
+    async with models.AsyncSession(models.engine) as session:
+        admin = models.DBUser(
+            username="statusadmin", email="statusadmin@test.com",
+            first_name="a", last_name="a", role=models.UserRole.administrator,
+        )
+        await admin.set_password("123456")
+        session.add(admin)
+        await session.commit()
+    response = await client.post(
+        "/token", data={"username": "statusadmin", "password": "123456"}
+    )
+    admin_headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await client.put(
+        f"/users/{user_id}/status", json={"status": "disabled"}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "disabled"
+    assert (await client.get(f"/users/{user_id}", headers=headers)).status_code == 401
+    # refresh tokens carry the old status, so their family ends as well
+    response = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_password(client: AsyncClient, register):
+    await register("customer", "rehash")
+    cheap_hash = bcrypt.using(rounds=4).hash("123456")
+
+    async with models.AsyncSession(models.engine) as session:
+        user = (
+            await session.exec(
+                select(models.DBUser).where(models.DBUser.username == "rehash")
+            )
+        ).one()
+        user.password = cheap_hash
+        session.add(user)
+        await session.commit()
+
+    response = await client.post(
+        "/token", data={"username": "rehash", "password": "123456"}
+    )
+    assert response.status_code == 200
+
+    async with models.AsyncSession(models.engine) as session:
+        user = (
+            await session.exec(
+                select(models.DBUser).where(models.DBUser.username == "rehash")
+            )
+        ).one()
+        assert user.password != cheap_hash
+        assert bcrypt.verify("123456", user.password)
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation(client: AsyncClient, register):
+    await register("customer", "refresher")
+    response = await client.post(
+        "/token", data={"username": "refresher", "password": "123456"}
+    )
+    first = response.json()["refresh_token"]
+
+    response = await client.post("/token/refresh", json={"refresh_token": first})
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert (await client.get("/users/me", headers=headers)).status_code == 200
+    # a refresh token is not an access token
+    headers = {"Authorization": f"Bearer {second}"}
+    assert (await client.get("/users/me", headers=headers)).status_code == 401
+
+    # reusing the rotated token revokes the whole family
+    response = await client.post("/token/refresh", json={"refresh_token": first})
+    assert response.status_code == 401
+    response = await client.post("/token/refresh", json={"refresh_token": second})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_refresh_tokens_keep_family_lifetime_and_claims(
+    client: AsyncClient, register
+):
+    await register("customer", "familyuser")
+    response = await client.post(
+        "/token", data={"username": "familyuser", "password": "123456"}
+    )
+    first = jwt.decode(
+        response.json()["refresh_token"], options={"verify_signature": False}
+    )
+
+    response = await client.post(
+        "/token/refresh", json={"refresh_token": response.json()["refresh_token"]}
+    )
+    assert response.status_code == 200
+    access = deps.decode_claims(response.json()["access_token"])
+    assert (access.role, access.customer_id) == ("customer", first["customer_id"])
+    second = jwt.decode(
+        response.json()["refresh_token"], options={"verify_signature": False}
+    )
+    assert second["exp"] <= first["exp"] + 1
+
+    # the family ends at its expiry, however often it was rotated
+    async with models.AsyncSession(models.engine) as session:
+        family = await session.get(models.DBRefreshTokenFamily, second["fam"])
+        family.expires_at = datetime.datetime.now() - datetime.timedelta(seconds=1)
+        session.add(family)
+        await session.commit()
+    response = await client.post(
+        "/token/refresh", json={"refresh_token": response.json()["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_password_change_ends_refresh_families(client: AsyncClient, register):
+    headers = await register("customer", "familyreset")
+    response = await client.post(
+        "/token", data={"username": "familyreset", "password": "123456"}
+    )
+    refresh_token = response.json()["refresh_token"]
+
+    response = await client.put(
+        "/users/change_password",
+        json={"current_password": "123456", "new_password": "654321"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    response = await client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_and_register_ignore_case(client: AsyncClient, register):
+    await register("customer", "CaseUser")
+
+    for login in ["caseuser", "CASEUSER", "caseuser@TEST.com"]:
+        response = await client.post(
+            "/token", data={"username": login, "password": "123456"}
+        )
+        assert response.status_code == 200, login
+
+    user_info = dict(
+        email="other@test.com",
+        username="caseUSER",
+        first_name="Firstname",
+        last_name="Lastname",
+        password="123456",
+    )
+    response = await client.post(
+        "/users/register_customer",
+        json={"user_info": user_info, "customer_info": {"name": "x"}},
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "This username already exists."
+
+    user_info.update(username="fresh", email="CASEUSER@test.com")
+    response = await client.post(
+        "/users/register_customer",
+        json={"user_info": user_info, "customer_info": {"name": "x"}},
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "This email already exists."
+
+
+@pytest.mark.asyncio
+async def test_last_login_date_written_in_batches(client: AsyncClient, register):
+    await register("customer", "lastlogin1")
+    await register("customer", "lastlogin2")
+    await login_activity.flush()
+
+    for name in ["lastlogin1", "lastlogin2"]:
+        response = await client.post(
+            "/token", data={"username": name, "password": "123456"}
+        )
+        assert response.status_code == 200
+    assert len(login_activity.pending) == 2
+
+    await login_activity.flush()
+    assert not login_activity.pending
+
+    async with models.AsyncSession(models.engine) as session:
+        result = await session.exec(
+            select(models.DBUser.last_login_date).where(
+                models.DBUser.username.in_(["lastlogin1", "lastlogin2"])
+            )
+        )
+        assert all(result.all())
@@ -0,0 +1,133 @@
+import asyncio
+
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlmodel import select
+import pytest
+
+from wallet_app import balances, models
+
+
+@pytest.mark.asyncio
+async def test_parallel_top_ups(client: AsyncClient, customer_headers: dict):
+    # SQLite serializes writers, keep the in-flight requests within its busy timeout
+    in_flight = asyncio.Semaphore(20)
+
+    async def top_up():
+        async with in_flight:
+            return await client.put(
+                "/wallets/add", json={"balance": 1.0}, headers=customer_headers
+            )
+
+    responses = await asyncio.gather(*(top_up() for _ in range(300)))
+    assert all(response.status_code == 200 for response in responses)
+
+    response = await client.put(
+        "/wallets/sub", json={"balance": 50.0}, headers=customer_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["balance"] == 250.0
+
+
+@pytest.mark.asyncio
+async def test_sub_balance_insufficient(client: AsyncClient, customer_headers: dict):
+    response = await client.put(
+        "/wallets/sub", json={"balance": 1_000_000.0}, headers=customer_headers
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_sharded_merchant_wallet(
+    client: AsyncClient,
+    merchant_headers: dict,
+    customer_headers: dict,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(balances.settings, "WALLET_SHARDS", 4)
+
+    response = await client.post(
+        "/items", json={"name": "sharded", "price": 1.0}, headers=merchant_headers
+    )
+    item_id = response.json()["id"]
+    await client.put("/wallets/add", json={"balance": 10.0}, headers=customer_headers)
+
+    for _ in range(10):
+        response = await client.post(
+            "/buy", json={"item_id": item_id}, headers=customer_headers
+        )
+        assert response.status_code == 200
+
+    async with models.AsyncSession(models.engine) as session:
+        merchant = await session.get(models.DBMerchant, response.json()["merchant_id"])
+        wallet = (
+            await session.exec(
+                select(models.DBWallet).where(models.DBWallet.user_id == merchant.user_id)
+            )
+        ).one()
+        wallet_id = wallet.id
+        shards = (await session.exec(select(models.DBWalletShard))).all()
+        before = (await client.get(f"/wallets/{wallet_id}")).json()["balance"]
+
+        assert sum(shard.balance for shard in shards) == 10.0
+        assert before == wallet.balance + 10.0
+
+        assert await balances.compact(session) == 1
+        await session.commit()
+
+        assert (await session.exec(select(models.DBWalletShard))).all() == []
+    assert (await client.get(f"/wallets/{wallet_id}")).json()["balance"] == before
+
+
+@pytest.mark.asyncio
+async def test_sharded_income_can_be_spent(
+    register, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(balances.settings, "WALLET_SHARDS", 4)
+    for kind, name in (
+        ("customer", "shardpayer"),
+        ("merchant", "shardearner"),
+        ("customer", "shardpayee"),
+    ):
+        await register(kind, name)
+
+    async with models.AsyncSession(models.engine) as session:
+        result = await session.exec(
+            select(models.DBUser.username, models.DBWallet.id)
+            .join(models.DBWallet, models.DBWallet.user_id == models.DBUser.id)
+            .where(
+                models.DBUser.username.in_(["shardpayer", "shardearner", "shardpayee"])
+            )
+        )
+        wallet_ids = dict(result.all())
+        payer = await session.get(models.DBWallet, wallet_ids["shardpayer"])
+        payer.balance = 5.0
+        session.add(payer)
+        await session.commit()
+
+        await balances.transfer(
+            session, wallet_ids["shardpayer"], wallet_ids["shardearner"], 5.0
+        )
+        # the income is still in the earner's shards
+        new_balances = await balances.transfer(
+            session, wallet_ids["shardearner"], wallet_ids["shardpayee"], 5.0
+        )
+        assert new_balances[wallet_ids["shardearner"]] == 0
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_transfer_to_same_wallet_rejected():
+    async with models.AsyncSession(models.engine) as session:
+        with pytest.raises(HTTPException) as raised:
+            await balances.transfer(session, 1, 1, 5.0)
+    assert raised.value.status_code == 400
+
+
+def test_wallet_columns_skip_shards_unless_sharded(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(balances.settings, "WALLET_SHARDS", 0)
+    assert "wallet_shards" not in str(select(*balances.wallet_columns()))
+
+    monkeypatch.setattr(balances.settings, "WALLET_SHARDS", 4)
+    assert "wallet_shards" in str(select(*balances.wallet_columns()))
@@ -0,0 +1,219 @@
+"""Balance changes done inside the database.
+
+Balances are never read into Python and written back; every change is a
+single UPDATE ... RETURNING, so concurrent requests cannot lose updates.
+On failure the statement may already have changed rows in the caller's
+transaction, which the caller must roll back (leaving the session without
+commit does that).
+
+With WALLET_SHARDS > 1 purchase credits are spread over that many
+wallet_shards rows per merchant wallet instead of all buyers queueing on
+the one wallet row; compact() folds them back into the wallet row.
+"""
+import asyncio
+import logging
+import random
+from collections import defaultdict
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, delete, func, or_, update
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import config
+from . import models
+
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+
+def sharded() -> bool:
+    return settings.WALLET_SHARDS > 1
+
+
+def balance_column():
+    """Wallet balance including credits not yet compacted from its shards."""
+    shard_total = (
+        select(func.coalesce(func.sum(models.DBWalletShard.balance), 0))
+        .where(models.DBWalletShard.wallet_id == models.DBWallet.id)
+        .scalar_subquery()
+    )
+    return (models.DBWallet.balance + shard_total).label("balance")
+
+
+def wallet_columns() -> list:
+    # without sharding there are no shard rows to add; run compact() before
+    # turning WALLET_SHARDS off so none are left behind
+    if not sharded():
+        return [models.DBWallet.balance, models.DBWallet.id, models.DBWallet.user_id]
+    return [balance_column(), models.DBWallet.id, models.DBWallet.user_id]
+
+
+def insufficient_balance_exception():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Insufficient balance",
+    )
+
+
+async def adjust(session, user_id: int, delta: float) -> models.DBWallet:
+    """Add delta (negative to withdraw) to the user's wallet.
+
+    A withdrawal only applies when the balance covers it.
+    """
+    if sharded():
+        await compact(
+            session,
+            select(models.DBWallet.id).where(models.DBWallet.user_id == user_id),
+        )
+
+    statement = update(models.DBWallet).where(models.DBWallet.user_id == user_id)
+    if delta < 0:
+        statement = statement.where(models.DBWallet.balance >= -delta)
+    statement = (
+        statement.values(balance=models.DBWallet.balance + delta)
+        .returning(models.DBWallet)
+        .execution_options(synchronize_session=False)
+    )
+    dbwallet = (await session.exec(statement)).scalar_one_or_none()
+
+    if dbwallet is None:
+        exists = await session.exec(
+            select(models.DBWallet.id).where(models.DBWallet.user_id == user_id)
+        )
+        if delta < 0 and exists.first():
+            raise insufficient_balance_exception()
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    return dbwallet
+
+
+async def transfer(
+    session, source_wallet_id: int, target_wallet_id: int, amount: float
+) -> dict[int, float]:
+    """Move amount from one wallet to another, see settle()."""
+    return await settle(session, source_wallet_id, {target_wallet_id: amount})
+
+
+async def settle(
+    session, source_wallet_id: int, credits: dict[int, float]
+) -> dict[int, float]:
+    """Debit the sum of credits from the source wallet and credit each
+    target wallet, all in one statement.
+
+    The rows are locked in wallet id order before they are changed, so two
+    purchases touching the same wallets cannot deadlock.
+    Returns the new balances keyed by wallet id.
+    """
+    # a debit and a credit on one row would be a purchase from oneself
+    if source_wallet_id in credits:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot pay into the paying wallet",
+        )
+    amount = sum(credits.values())
+    if sharded():
+        # the source may be a merchant spending credits still in its shards
+        await compact(session, [source_wallet_id])
+        deltas = {source_wallet_id: -amount}
+    else:
+        deltas = dict(credits)
+        deltas[source_wallet_id] = deltas.get(source_wallet_id, 0) - amount
+
+    # PostgreSQL takes the row locks in the subquery's id order; SQLite
+    # drops FOR UPDATE and needs none, as it runs one writer at a time
+    locked = aliased(models.DBWallet)
+    lock_in_order = (
+        select(locked.id)
+        .where(locked.id.in_(list(deltas)))
+        .order_by(locked.id)
+        .with_for_update()
+    )
+    statement = (
+        update(models.DBWallet)
+        .where(models.DBWallet.id.in_(lock_in_order))
+        .where(
+            or_(
+                models.DBWallet.id != source_wallet_id,
+                models.DBWallet.balance >= amount,
+            )
+        )
+        .values(
+            balance=models.DBWallet.balance
+            + case(deltas, value=models.DBWallet.id)
+        )
+        .returning(models.DBWallet.id, models.DBWallet.balance)
+        .execution_options(synchronize_session=False)
+    )
+    balances = dict((await session.exec(statement)).all())
+
+    if source_wallet_id not in balances:
+        raise insufficient_balance_exception()
+
+    if sharded():
+        await _credit_shards(session, credits)
+    return balances
+
+
+async def _credit_shards(session, credits: dict[int, float]):
+    statement = models.dialect_insert(session, models.DBWalletShard).values(
+        [
+            dict(
+                wallet_id=wallet_id,
+                shard=random.randrange(settings.WALLET_SHARDS),
+                balance=amount,
+            )
+            # in wallet id order, like the wallet rows in settle()
+            for wallet_id, amount in sorted(credits.items())
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["wallet_id", "shard"],
+        set_={"balance": models.DBWalletShard.balance + statement.excluded.balance},
+    )
+    await session.exec(statement)
+
+
+async def compact(session, wallet_ids=None) -> int:
+    """Fold shard balances into their wallet rows.
+
+    wallet_ids may be a list or a select of wallet ids, None compacts every
+    wallet. Returns the number of wallets changed. Does not commit.
+    """
+    statement = delete(models.DBWalletShard)
+    if wallet_ids is not None:
+        statement = statement.where(models.DBWalletShard.wallet_id.in_(wallet_ids))
+    result = await session.exec(
+        statement.returning(
+            models.DBWalletShard.wallet_id, models.DBWalletShard.balance
+        ).execution_options(synchronize_session=False)
+    )
+
+    totals = defaultdict(float)
+    for wallet_id, balance in result.all():
+        totals[wallet_id] += balance
+
+    if totals:
+        await session.exec(
+            update(models.DBWallet)
+            .where(models.DBWallet.id.in_(list(totals)))
+            .values(
+                balance=models.DBWallet.balance
+                + case(totals, value=models.DBWallet.id)
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return len(totals)
+
+
+async def compact_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSession(models.engine) as session:
+                await compact(session)
+                await session.commit()
+        except Exception:
+            logger.exception("wallet shard compaction failed")
@@ -0,0 +1,179 @@
+"""Bulk item import (NDJSON/CSV) and bulk price updates.
+
+Imports are parsed as the request body streams in and inserted
+batch_size rows per statement; rows that fail validation are reported
+by line number and skipped.
+"""
+import csv
+import json
+import datetime
+from typing import AsyncIterator, Literal
+
+import pydantic
+from sqlalchemy import Float, Integer, bindparam, column, func, insert, update, values
+from sqlmodel import select
+
+from . import counters
+from . import models
+
+
+ImportFormat = Literal["ndjson", "csv"]
+
+MAX_REPORTED_ERRORS = 100
+
+
+async def lines(body: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed body into text lines without reading it whole."""
+    pending = b""
+    async for chunk in body:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            yield line.decode(errors="replace").rstrip("\r")
+    if pending:
+        yield pending.decode(errors="replace").rstrip("\r")
+
+
+async def ndjson_records(body) -> AsyncIterator[tuple[int, dict | Exception]]:
+    number = 0
+    async for line in lines(body):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, e
+            continue
+        if not isinstance(record, dict):
+            record = ValueError("expected a JSON object")
+        yield number, record
+
+
+async def csv_records(body) -> AsyncIterator[tuple[int, dict | Exception]]:
+    header = None
+    number = 0
+    record = ""
+    async for line in lines(body):
+        number += 1
+        # a quoted field may span lines; quotes are balanced once it ends
+        record += line
+        if record.count('"') % 2:
+            record += "\n"
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+
+        row = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lstrip("\ufeff") for name in row]
+            continue
+        if len(row) != len(header):
+            yield number, ValueError(f"expected {len(header)} fields, got {len(row)}")
+            continue
+        yield number, {name: value or None for name, value in zip(header, row)}
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, pydantic.ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+
+async def import_items(
+    session,
+    body: AsyncIterator[bytes],
+    format: ImportFormat,
+    user_id: int,
+    merchant_id: int,
+    batch_size: int,
+) -> models.ItemImportResult:
+    """Insert valid rows batch by batch, committing each batch."""
+    records = csv_records(body) if format == "csv" else ndjson_records(body)
+    result = models.ItemImportResult(inserted=0, failed=0, errors=[])
+    batch = []
+
+    async def flush():
+        await session.exec(insert(models.DBItem), params=batch)
+        await counters.track(session, counters.ITEMS, merchant_id, len(batch))
+        await session.commit()
+        result.inserted += len(batch)
+        batch.clear()
+
+    async for number, record in records:
+        try:
+            if isinstance(record, Exception):
+                raise record
+            item = models.CreatedItem.model_validate(record)
+        except (ValueError, pydantic.ValidationError) as e:
+            result.failed += 1
+            if len(result.errors) < MAX_REPORTED_ERRORS:
+                result.errors.append(models.ItemImportError(line=number, error=_describe(e)))
+            continue
+
+        batch.append(dict(item.model_dump(), user_id=user_id, merchant_id=merchant_id))
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+    return result
+
+
+async def update_prices(
+    session, merchant_id: int, updates: list[models.ItemPriceUpdate]
+) -> models.ItemPriceUpdateResult:
+    """Set price and tax of the merchant's items in one statement. Does not commit."""
+    items = models.DBItem.__table__
+    requested = {change.id: change for change in updates}
+    now = datetime.datetime.now()
+
+    if session.bind.dialect.name == "sqlite":
+        # SQLite has no column aliases for VALUES in FROM; executemany instead
+        result = await session.exec(
+            select(models.DBItem.id).where(
+                models.DBItem.id.in_(requested), models.DBItem.merchant_id == merchant_id
+            )
+        )
+        updated = result.all()
+        if updated:
+            await session.exec(
+                update(items)
+                .where(items.c.id == bindparam("item_id"))
+                .values(
+                    price=func.coalesce(bindparam("new_price"), items.c.price),
+                    tax=func.coalesce(bindparam("new_tax"), items.c.tax),
+                    updated_date=now,
+                ),
+                params=[
+                    dict(
+                        item_id=item_id,
+                        new_price=requested[item_id].price,
+                        new_tax=requested[item_id].tax,
+                    )
+                    for item_id in updated
+                ],
+            )
+    else:
+        changes = values(
+            column("id", Integer), column("price", Float), column("tax", Float),
+            name="changes",
+        ).data([(change.id, change.price, change.tax) for change in requested.values()])
+        result = await session.exec(
+            update(items)
+            .where(items.c.id == changes.c.id, items.c.merchant_id == merchant_id)
+            .values(
+                price=func.coalesce(changes.c.price, items.c.price),
+                tax=func.coalesce(changes.c.tax, items.c.tax),
+                updated_date=now,
+            )
+            .returning(items.c.id)
+        )
+        updated = result.scalars().all()
+
+    return models.ItemPriceUpdateResult(
+        updated=len(updated), not_found=sorted(set(requested) - set(updated))
+    )
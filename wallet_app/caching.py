@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded in-process cache, least recently used entries go first.
+
+    Entries also expire ttl seconds after they are stored. Not shared
+    between workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, ttl: float | None = None):
+        if self.maxsize <= 0:
+            return
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return dict(
+            size=len(self.entries),
+            maxsize=self.maxsize,
+            hits=self.hits,
+            misses=self.misses,
+        )
@@ -3,11 +3,52 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     SQLDB_URL: str
+    SQLDB_ECHO: bool = False
+    SQLDB_POOL_SIZE: int = 5
+    SQLDB_MAX_OVERFLOW: int = 10
+    SQLDB_POOL_TIMEOUT: float = 30  # seconds to wait for a free connection
+    SQLDB_POOL_RECYCLE: int = 30 * 60  # seconds, -1 = never
+    SQLDB_POOL_PRE_PING: bool = True
+    SQLDB_POOL_WARMUP: int = 5  # connections opened at startup
+
+    SQLDB_REPLICA_URLS: str = ""  # comma separated, used by read-only routes
+    SQLDB_REPLICA_RETRY: float = 30  # seconds before a failed replica is retried
+
+    USER_CACHE_SIZE: int = 10_000  # authenticated users kept in memory, 0 = off
+    USER_CACHE_TTL: float = 60  # seconds
+
+    STATELESS_AUTH: bool = False  # authorize from token claims, no user lookup
+    REVOCATION_REFRESH_INTERVAL: float = 30  # seconds
+    LOGIN_FLUSH_INTERVAL: float = 5  # seconds between last_login_date writes
+
+    PASSWORD_SCHEME: str = "bcrypt"  # or "argon2"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # hashing processes, 0 = on the event loop
+    PASSWORD_HASH_CONCURRENCY: int = 8  # hashes in flight per app process
     SECRET_KEY: str = "secret"
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 5 * 60  # 5 minutes
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 7 * 24 * 60  # 7 days
 
+    ITEM_IMPORT_BATCH_SIZE: int = 1000  # rows per insert in POST /items/bulk
+    SEARCH_CANDIDATES: int = 1000  # newest matches ranked by GET /items/search
+
+    ITEM_CACHE_SIZE: int = 10_000  # serialized items kept in memory, 0 = off
+    ITEM_CACHE_TTL: float = 60  # seconds
+    ITEM_CACHE_WARMUP: int = 0  # most purchased items loaded at startup
+
+    MERCHANT_STATS_MAX_DAYS: int = 366  # longest range of GET /merchants/{id}/stats
+
+    COUNTER_CACHE_TTL: float = 0  # seconds, 0 = always read the counter row
+    COUNTER_SHARDS: int = 0  # spread counter increments over N rows, 0 = off
+
+    WALLET_SHARDS: int = 0  # credit merchant wallets through N shard rows, 0 = off
+    WALLET_COMPACT_INTERVAL: float = 5  # seconds between shard compactions
+
+    PURCHASE_GROUP_COMMIT: bool = False  # commit concurrent /buy calls together
+    GROUP_COMMIT_MAX_BATCH: int = 64
+    GROUP_COMMIT_WINDOW_MS: float = 5
+
     model_config = SettingsConfigDict(
         env_file=".env", validate_assignment=True, extra="allow"
     )
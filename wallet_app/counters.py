@@ -0,0 +1,127 @@
+"""Row counts kept next to the data instead of COUNT(*) per request.
+
+Counters are changed in the caller's session, so they commit or roll back
+together with the insert/delete they describe. Counter rows start at zero
+when the schema is created; on an existing database run rebuild() once.
+
+Every purchase changes the table-wide counter, and PostgreSQL keeps the
+upserted row locked until commit. With COUNTER_SHARDS > 1 each change goes
+to one of that many rows per counter, picked at random, and reads sum them.
+"""
+import random
+import time
+
+from sqlmodel import select, delete, func
+
+from . import config
+from . import models
+
+
+ITEMS = "items"
+TRANSACTIONS = "transactions"
+
+GLOBAL_SCOPE = 0
+
+settings = config.get_settings()
+
+_cache: dict[tuple[str, int], tuple[int, float]] = {}
+
+
+async def increment(session, name: str, scope_id: int = GLOBAL_SCOPE, delta: int = 1):
+    await _upsert(session, [(name, scope_id, delta)])
+
+
+async def track(session, name: str, merchant_id: int | None, delta: int = 1):
+    """Change both the table-wide and the per-merchant counter."""
+    changes = [(name, GLOBAL_SCOPE, delta)]
+    if merchant_id is not None:
+        changes.append((name, merchant_id, delta))
+    await _upsert(session, changes)
+
+
+async def track_many(session, name: str, per_merchant: dict[int, int]):
+    """Like track() for several merchants at once."""
+    changes = [(name, GLOBAL_SCOPE, sum(per_merchant.values()))]
+    changes += [(name, merchant_id, delta) for merchant_id, delta in per_merchant.items()]
+    await _upsert(session, changes)
+
+
+def shard() -> int:
+    if settings.COUNTER_SHARDS > 1:
+        return random.randrange(settings.COUNTER_SHARDS)
+    return 0
+
+
+async def _upsert(session, changes: list[tuple[str, int, int]]):
+    # one multi-row statement, however many counters change; rows in key
+    # order, so two transactions lock them in the same order
+    statement = models.dialect_insert(session, models.DBCounter).values(
+        [
+            dict(name=name, scope_id=scope_id, shard=shard(), value=delta)
+            for name, scope_id, delta in sorted(changes)
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["name", "scope_id", "shard"],
+        set_={"value": models.DBCounter.value + statement.excluded.value},
+    )
+    await session.exec(statement)
+    for name, scope_id, _ in changes:
+        _cache.pop((name, scope_id), None)
+
+
+async def forget_scope(session, name: str, scope_id: int):
+    """Drop a per-merchant counter, e.g. when its rows are cascade deleted."""
+    value = await get_count(session, name, scope_id, approximate=False)
+    await increment(session, name, GLOBAL_SCOPE, -value)
+    await session.exec(
+        delete(models.DBCounter).where(
+            models.DBCounter.name == name, models.DBCounter.scope_id == scope_id
+        )
+    )
+    _cache.pop((name, scope_id), None)
+
+
+async def get_count(
+    session, name: str, scope_id: int = GLOBAL_SCOPE, approximate: bool = True
+) -> int:
+    """Read a counter.
+
+    With COUNTER_CACHE_TTL > 0 and approximate=True the value may be served
+    from this process' cache for up to that many seconds.
+    """
+    key = (name, scope_id)
+    ttl = settings.COUNTER_CACHE_TTL
+    if approximate and ttl > 0:
+        cached = _cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+    result = await session.exec(
+        select(func.coalesce(func.sum(models.DBCounter.value), 0)).where(
+            models.DBCounter.name == name, models.DBCounter.scope_id == scope_id
+        )
+    )
+    value = result.one()
+
+    # only approximate readers trust the cache, so only they fill it
+    if approximate and ttl > 0:
+        _cache[key] = (value, time.monotonic() + ttl)
+    return value
+
+
+async def rebuild(session):
+    """Recompute every counter from the source tables."""
+    await session.exec(delete(models.DBCounter))
+    for name, table in ((ITEMS, models.DBItem), (TRANSACTIONS, models.DBTransaction)):
+        total = (await session.exec(select(func.count(table.id)))).one()
+        session.add(models.DBCounter(name=name, scope_id=GLOBAL_SCOPE, value=total))
+
+        result = await session.exec(
+            select(table.merchant_id, func.count(table.id)).group_by(table.merchant_id)
+        )
+        for merchant_id, value in result.all():
+            session.add(models.DBCounter(name=name, scope_id=merchant_id, value=value))
+
+    await session.commit()
+    _cache.clear()
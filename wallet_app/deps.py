@@ -1,46 +1,104 @@
-from fastapi import Depends, HTTPException, logger, status, Path, Query
+from fastapi import Depends, HTTPException, status, Path, Query
 from fastapi.security import OAuth2PasswordBearer
 
+import logging
+import time
 import typing
 import jwt
 
 from pydantic import ValidationError
 
+from . import caching
 from . import models
+from . import revocations
 from . import security
 from . import config
 
 
+logger = logging.getLogger(__name__)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
 settings = config.get_settings()
 
+# token -> decoded claims, so a known token skips JWT verification
+token_cache = caching.LRUCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+# user id -> models.User snapshot, so a known user skips the database
+user_cache = caching.LRUCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
 
-async def get_current_user(
-    token: typing.Annotated[str, Depends(oauth2_scheme)],
-    session: typing.Annotated[models.AsyncSession, Depends(models.get_session)],
-) -> models.User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+
+def invalidate_user(user_id: int):
+    """Call after changing a user's row so the next request reloads it."""
+    user_cache.invalidate(user_id)
+
+
+def user_cache_stats() -> dict:
+    return dict(tokens=token_cache.stats(), users=user_cache.stats())
+
+
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def decode_claims(token: str) -> models.TokenClaims:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        user_id: int = payload.get("sub")
+        return models.TokenClaims.model_validate(payload)
+
+    except (jwt.PyJWTError, ValidationError) as e:
+        print(e)
+        raise credentials_exception
+
 
-        if user_id is None:
+async def get_token_claims(
+    token: typing.Annotated[str, Depends(oauth2_scheme)],
+) -> models.TokenClaims:
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = decode_claims(token)
+        if claims.typ == "refresh":
             raise credentials_exception
 
-    except jwt.JWTError as e:
-        print(e)
+        ttl = claims.exp - time.time() if claims.exp else None
+        token_cache.put(token, claims, ttl=ttl)
+
+    if revocations.is_revoked(claims):
         raise credentials_exception
+    return claims
+
+
+async def get_current_user(
+    claims: typing.Annotated[models.TokenClaims, Depends(get_token_claims)],
+    session: typing.Annotated[models.AsyncSession, Depends(models.get_session)],
+) -> models.User:
+    """The user of the token; with STATELESS_AUTH only id, role and status."""
+    if settings.STATELESS_AUTH and claims.is_stateless():
+        return claims.to_user()
+    return await load_user(claims, session)
 
-    user = await session.get(models.DBUser, user_id)
+
+async def get_current_full_user(
+    claims: typing.Annotated[models.TokenClaims, Depends(get_token_claims)],
+    session: typing.Annotated[models.AsyncSession, Depends(models.get_session)],
+) -> models.User:
+    """The user of the token with every field, from the cache or the database."""
+    return await load_user(claims, session)
+
+
+async def load_user(claims: models.TokenClaims, session) -> models.User:
+    user = user_cache.get(claims.sub)
     if user is None:
-        raise credentials_exception
+        dbuser = await session.get(models.DBUser, claims.sub)
+        if dbuser is None:
+            raise credentials_exception
+
+        user = models.User.from_orm(dbuser)
+        user_cache.put(claims.sub, user)
 
     return user
 
@@ -56,7 +114,7 @@ async def get_current_active_user(
 async def get_current_active_superuser(
     current_user: typing.Annotated[models.User, Depends(get_current_user)],
 ) -> models.User:
-    if "admin" not in current_user.roles:
+    if current_user.role != models.UserRole.administrator:
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
         )
@@ -71,8 +129,7 @@ class RoleChecker:
         self,
         user: typing.Annotated[models.User, Depends(get_current_active_user)],
     ):
-        for role in user.roles:
-            if role in self.allowed_roles:
-                return
-        logger.debug(f"User with role {user.roles} not in {self.allowed_roles}")
+        if user.role in self.allowed_roles:
+            return
+        logger.debug(f"User with role {user.role} not in {self.allowed_roles}")
         raise HTTPException(status_code=403, detail="Role not permitted")
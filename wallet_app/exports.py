@@ -0,0 +1,89 @@
+"""Streaming NDJSON/CSV exports.
+
+Rows are read through a server-side cursor and written out chunk by chunk,
+so memory use does not depend on the size of the table.
+"""
+import contextlib
+import csv
+import io
+import json
+from typing import Literal
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+
+from . import models
+
+
+CHUNK_SIZE = 1000
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def columns_for(schema, table) -> list:
+    return [getattr(table, name) for name in schema.model_fields]
+
+
+async def _stream_rows(statement):
+    # the request session is closed before a streaming body is sent, so the
+    # export owns its session for the lifetime of the response; aclosing()
+    # returns the connection even when the client goes away mid-stream
+    async with contextlib.aclosing(models.get_read_session()) as sessions:
+        async for session in sessions:
+            result = await session.stream(
+                statement.execution_options(yield_per=CHUNK_SIZE)
+            )
+            async for rows in result.partitions():
+                yield rows
+
+
+def _to_json(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+async def _ndjson(statement):
+    async with contextlib.aclosing(_stream_rows(statement)) as partitions:
+        async for rows in partitions:
+            yield "".join(
+                json.dumps(dict(row._mapping), default=_to_json) + "\n"
+                for row in rows
+            )
+
+
+async def _csv(statement, header: list[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+
+    async with contextlib.aclosing(_stream_rows(statement)) as partitions:
+        async for rows in partitions:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(rows)
+            yield buffer.getvalue()
+
+
+def export_response(
+    schema, table, format: ExportFormat, filename: str, columns: list | None = None
+):
+    if columns is None:
+        columns = columns_for(schema, table)
+    statement = select(*columns).order_by(table.id)
+
+    if format == "csv":
+        body = _csv(statement, [column.key for column in columns])
+    else:
+        body = _ndjson(statement)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format}"'
+        },
+    )
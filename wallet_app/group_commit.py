@@ -0,0 +1,129 @@
+"""Group commit for /buy.
+
+Purchases arriving at the same worker are queued and applied together in
+one database transaction, so many purchases share one commit (and one
+fsync). Each purchase runs in its own savepoint: one that fails, e.g. for
+insufficient balance, is rolled back alone and only its caller sees the
+error.
+
+The app's lifespan starts the batcher with start() and drains it with
+stop(); get_batcher() starts one from the current settings otherwise.
+"""
+import asyncio
+
+from fastapi import HTTPException, status
+
+from . import config
+from . import models
+from . import purchases
+
+
+class PurchaseBatcher:
+    def __init__(self, max_batch: int, window: float):
+        self.max_batch = max_batch
+        self.window = window
+
+        self.pending: list[tuple[int, models.CreatedTransaction, asyncio.Future]] = []
+        self.timer: asyncio.Task | None = None
+        self.flushes: set[asyncio.Task] = set()
+
+    async def submit(
+        self, user_id: int, transaction: models.CreatedTransaction
+    ) -> models.Transaction:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((user_id, transaction, future))
+
+        if len(self.pending) >= self.max_batch:
+            self._flush_now()
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self._flush_later())
+
+        return await future
+
+    async def drain(self):
+        if self.pending:
+            self._flush_now()
+        if self.flushes:
+            await asyncio.gather(*self.flushes, return_exceptions=True)
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self.timer = None
+        self._flush_now()
+
+    def _flush_now(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+        batch, self.pending = self.pending, []
+        task = asyncio.create_task(self._apply(batch))
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+
+    async def _apply(self, batch):
+        applied = []
+        failure: Exception = HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Purchase was not applied",
+        )
+        try:
+            async with models.AsyncSession(
+                models.engine, expire_on_commit=False
+            ) as session:
+                for user_id, transaction, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            dbtransaction = await purchases.purchase(
+                                session, user_id, transaction
+                            )
+                    except Exception as e:
+                        _resolve(future, error=e)
+                    else:
+                        applied.append((future, dbtransaction))
+
+                await session.commit()
+        except Exception as e:
+            failure = e
+        else:
+            for future, dbtransaction in applied:
+                _resolve(future, models.Transaction.from_orm(dbtransaction))
+        finally:
+            # whatever failed, the session, the commit or a cancellation,
+            # no caller may be left waiting
+            for _, _, future in batch:
+                _resolve(future, error=failure)
+
+
+def _resolve(future: asyncio.Future, result=None, error: Exception | None = None):
+    # the caller may have gone away and cancelled its future
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+batcher: PurchaseBatcher | None = None
+
+
+def start(settings) -> PurchaseBatcher:
+    global batcher
+    batcher = PurchaseBatcher(
+        settings.GROUP_COMMIT_MAX_BATCH, settings.GROUP_COMMIT_WINDOW_MS / 1000
+    )
+    return batcher
+
+
+def get_batcher() -> PurchaseBatcher:
+    if batcher is None:
+        return start(config.get_settings())
+    return batcher
+
+
+async def stop():
+    global batcher
+    if batcher is not None:
+        await batcher.drain()
+        batcher = None
@@ -0,0 +1,113 @@
+"""Serialized items for GET /items/item_id/{item_id}.
+
+Entries hold the response body with its ETag and Last-Modified values, so a
+hit costs no query and no serialization. Item writes on this worker
+invalidate their entries; other workers see changes within ITEM_CACHE_TTL.
+"""
+import datetime
+import email.utils
+import hashlib
+import logging
+from typing import NamedTuple
+
+from sqlmodel import func, select
+
+from . import caching
+from . import config
+from . import models
+
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+cache = caching.LRUCache(settings.ITEM_CACHE_SIZE, settings.ITEM_CACHE_TTL)
+
+# bumped on every invalidation, so a read that raced a write is not stored;
+# one counter for all items keeps it from growing with the catalog
+_generation = 0
+
+
+class CachedItem(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: str | None
+
+
+def serialize(dbitem: models.DBItem) -> CachedItem:
+    body = models.Item.from_orm(dbitem).model_dump_json().encode()
+    etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+
+    last_modified = None
+    if dbitem.updated_date is not None:
+        updated = dbitem.updated_date.astimezone(datetime.timezone.utc)
+        last_modified = email.utils.format_datetime(updated, usegmt=True)
+    return CachedItem(body, etag, last_modified)
+
+
+async def get(item_id: int) -> CachedItem | None:
+    entry = cache.get(item_id)
+    if entry is not None:
+        return entry
+
+    # a hit needs no connection, so the session is opened on a miss only
+    generation = _generation
+    async for session in models.get_read_session():
+        dbitem = await session.get(models.DBItem, item_id)
+    if dbitem is None:
+        return None
+
+    entry = serialize(dbitem)
+    if _generation == generation:
+        cache.put(item_id, entry)
+    return entry
+
+
+def not_modified(
+    entry: CachedItem, if_none_match: str | None, if_modified_since: str | None
+) -> bool:
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or entry.etag in tags
+
+    if if_modified_since is None or entry.last_modified is None:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified drops the fraction of a second, and a change later in the
+    # same second would still match, so only an older second counts
+    return email.utils.parsedate_to_datetime(entry.last_modified) < since
+
+
+def invalidate(*item_ids: int):
+    """Call after changing or deleting items."""
+    global _generation
+
+    _generation += 1
+    for item_id in item_ids:
+        cache.invalidate(item_id)
+
+
+async def warm_up(count: int):
+    """Load the count most purchased items."""
+    if count <= 0 or settings.ITEM_CACHE_SIZE <= 0:
+        return
+
+    try:
+        async for session in models.get_read_session():
+            top = (
+                select(models.DBTransaction.item_id)
+                .group_by(models.DBTransaction.item_id)
+                .order_by(func.count().desc())
+                .limit(count)
+                .subquery()
+            )
+            result = await session.exec(
+                select(models.DBItem).where(models.DBItem.id.in_(select(top.c.item_id)))
+            )
+            for dbitem in result.all():
+                cache.put(dbitem.id, serialize(dbitem))
+    except Exception:
+        logger.exception("warming the item cache failed")
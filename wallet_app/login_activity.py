@@ -0,0 +1,74 @@
+"""Buffered last_login_date updates.
+
+POST /token records the login time here instead of writing the users row.
+Timestamps are coalesced per user and written in one bulk UPDATE every
+LOGIN_FLUSH_INTERVAL seconds, and once more at shutdown.
+"""
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy import DateTime, Integer, bindparam, column, update, values
+
+from . import deps
+from . import models
+
+
+logger = logging.getLogger(__name__)
+
+pending: dict[int, datetime.datetime] = {}
+
+
+def record(user_id: int, when: datetime.datetime | None = None):
+    pending[user_id] = when or datetime.datetime.now()
+
+
+async def flush():
+    global pending
+
+    if not pending:
+        return
+
+    batch, pending = pending, {}
+    try:
+        async with models.engine.begin() as conn:
+            await _write(conn, batch)
+    except Exception:
+        logger.exception("writing last login dates failed")
+        # keep the newest timestamp per user for the next attempt
+        for user_id, when in batch.items():
+            if pending.get(user_id, when) <= when:
+                pending[user_id] = when
+        return
+
+    for user_id in batch:
+        deps.invalidate_user(user_id)
+
+
+async def _write(conn, batch: dict[int, datetime.datetime]):
+    users = models.DBUser.__table__
+
+    if conn.dialect.name == "sqlite":
+        # SQLite has no column aliases for VALUES in FROM; executemany instead
+        await conn.execute(
+            update(users)
+            .where(users.c.id == bindparam("user_id"))
+            .values(last_login_date=bindparam("when")),
+            [dict(user_id=user_id, when=when) for user_id, when in batch.items()],
+        )
+        return
+
+    logins = values(
+        column("user_id", Integer), column("when", DateTime), name="logins"
+    ).data(list(batch.items()))
+    await conn.execute(
+        update(users)
+        .where(users.c.id == logins.c.user_id)
+        .values(last_login_date=logins.c.when)
+    )
+
+
+async def flush_forever(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await flush()
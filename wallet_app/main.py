@@ -1,14 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from . import balances
 from . import config
+from . import group_commit
+from . import item_cache
+from . import login_activity
 from . import models
+from . import passwords
+from . import responses
+from . import revocations
 
 from . import routers
 
 
-def create_app():
-    settings = config.get_settings()
-    app = FastAPI()
+def create_app(settings=None):
+    if settings is None:
+        settings = config.get_settings()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await models.warm_up(settings.SQLDB_POOL_WARMUP)
+        group_commit.start(settings)
+
+        revocation_refresh = asyncio.create_task(
+            revocations.refresh_forever(settings.REVOCATION_REFRESH_INTERVAL)
+        )
+
+        item_cache_warmup = asyncio.create_task(
+            item_cache.warm_up(settings.ITEM_CACHE_WARMUP)
+        )
+        login_flush = asyncio.create_task(
+            login_activity.flush_forever(settings.LOGIN_FLUSH_INTERVAL)
+        )
+
+        # balances decides whether credits are sharded, so ask it
+        wallet_compaction = None
+        if balances.sharded():
+            wallet_compaction = asyncio.create_task(
+                balances.compact_forever(balances.settings.WALLET_COMPACT_INTERVAL)
+            )
+
+        yield
+
+        revocation_refresh.cancel()
+        login_flush.cancel()
+        item_cache_warmup.cancel()
+        if wallet_compaction:
+            wallet_compaction.cancel()
+        await group_commit.stop()
+        await login_activity.flush()
+        await models.dispose()
+        passwords.shutdown()
+
+    app = FastAPI(lifespan=lifespan, default_response_class=responses.DefaultResponse)
 
     models.init_db(settings)
 
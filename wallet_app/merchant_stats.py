@@ -0,0 +1,247 @@
+"""Sales per merchant and day, kept next to the transactions.
+
+Purchases add to the rollups in the caller's session, so they commit or
+roll back together with the transaction rows, and GET /merchants/{id}/stats
+reads one row per day instead of aggregating transactions. On an existing
+database run rebuild() once (scripts/rebuild-merchant-stats.py).
+
+Every sale of a merchant lands on the same day rows, which PostgreSQL
+keeps locked until commit. Like the counters, the rows are spread over
+COUNTER_SHARDS shards and read() sums them.
+"""
+import datetime
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import Date, cast, literal, type_coerce
+from sqlmodel import delete, func, select
+
+from . import counters
+from . import models
+
+
+# merchant_id, item_id, price, quantity; a negative quantity takes a sale back
+Sale = tuple[int, int, float, int]
+
+UPSERT_ROWS = 1000  # keeps SQLite under its bound parameter limit
+
+
+async def track(session, day: datetime.date, sales: Iterable[Sale]):
+    """Add sales made on day to the rollups. Does not commit."""
+    rows = []
+    for merchant_id, item_id, price, quantity in sales:
+        rows.append((merchant_id, day, item_id, quantity, price * quantity))
+    await _add(session, rows)
+
+
+async def _add(session, rows: Iterable[tuple]):
+    """Add (merchant_id, day, item_id, orders, revenue) rows."""
+    totals = defaultdict(lambda: [0, 0.0])
+    per_item = defaultdict(lambda: [0, 0.0])
+    for merchant_id, day, item_id, orders, revenue in rows:
+        for key, sums in (
+            ((merchant_id, day), totals),
+            ((merchant_id, day, item_id), per_item),
+        ):
+            sums[key][0] += orders
+            sums[key][1] += revenue
+
+    # an upsert may not touch one row twice, so the keys are summed first;
+    # sorted keys make concurrent upserts lock the rows in the same order
+    await _upsert(
+        session,
+        models.DBMerchantDailyStats,
+        [
+            dict(
+                merchant_id=merchant_id, day=day, shard=counters.shard(),
+                orders=orders, revenue=revenue,
+            )
+            for (merchant_id, day), (orders, revenue) in sorted(totals.items())
+        ],
+    )
+    await _upsert(
+        session,
+        models.DBMerchantDailyItemStats,
+        [
+            dict(
+                merchant_id=merchant_id, day=day, item_id=item_id,
+                shard=counters.shard(), orders=orders, revenue=revenue,
+            )
+            for (merchant_id, day, item_id), (orders, revenue) in sorted(
+                per_item.items()
+            )
+        ],
+    )
+
+    # sales taken back can empty a day or an item, which read() would list
+    taken_back = {key[:2] for key, (orders, _) in per_item.items() if orders < 0}
+    for merchant_id, day in sorted(taken_back):
+        await _drop_empty(session, merchant_id, day)
+
+
+async def _drop_empty(session, merchant_id: int, day: datetime.date):
+    """Delete the day's shard rows of keys whose orders add up to zero."""
+    for table, keys in (
+        (models.DBMerchantDailyStats, []),
+        (models.DBMerchantDailyItemStats, [models.DBMerchantDailyItemStats.item_id]),
+    ):
+        rows = (
+            table.merchant_id == merchant_id,
+            table.day == day,
+        )
+        empty = (
+            select(*keys, func.sum(table.orders))
+            .where(*rows)
+            .group_by(*keys)
+            .having(func.sum(table.orders) <= 0)
+        )
+        if keys:
+            statement = delete(table).where(
+                *rows, table.item_id.in_(empty.with_only_columns(*keys))
+            )
+        else:
+            statement = delete(table).where(*rows, empty.exists())
+        await session.exec(statement)
+
+
+async def _upsert(session, table, rows: list[dict]):
+    for start in range(0, len(rows), UPSERT_ROWS):
+        statement = models.dialect_insert(session, table).values(
+            rows[start:start + UPSERT_ROWS]
+        )
+        await session.exec(_on_conflict_add(table, statement))
+
+
+def _on_conflict_add(table, statement):
+    return statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.__table__.primary_key],
+        set_={
+            "orders": table.orders + statement.excluded.orders,
+            "revenue": table.revenue + statement.excluded.revenue,
+        },
+    )
+
+
+async def forget(session, merchant_id: int):
+    """Drop a merchant's rollups, e.g. when the merchant is deleted."""
+    for table in (models.DBMerchantDailyStats, models.DBMerchantDailyItemStats):
+        await session.exec(delete(table).where(table.merchant_id == merchant_id))
+
+
+def _day(session, column):
+    if session.bind.dialect.name == "sqlite":
+        # CAST(... AS DATE) is numeric on SQLite
+        return type_coerce(func.date(column), Date)
+    return cast(column, Date)
+
+
+async def rebuild(session, chunk: int = 50_000):
+    """Recompute the rollups from the transactions, chunk ids per commit.
+
+    Each chunk is aggregated and upserted inside the database. Like
+    counters.rebuild(), run it while no purchases are made. Transactions
+    without a created_date are left out.
+    """
+    transactions = models.DBTransaction
+    for table in (models.DBMerchantDailyStats, models.DBMerchantDailyItemStats):
+        await session.exec(delete(table))
+    await session.commit()
+
+    last_id = (await session.exec(select(func.max(transactions.id)))).one() or 0
+    day = _day(session, transactions.created_date)
+    for start in range(0, last_id, chunk):
+        for table, keys in (
+            (models.DBMerchantDailyStats, [transactions.merchant_id, day]),
+            (
+                models.DBMerchantDailyItemStats,
+                [transactions.merchant_id, day, transactions.item_id],
+            ),
+        ):
+            # rebuilt rows all go to shard 0
+            rows = (
+                select(
+                    *keys,
+                    literal(0),
+                    func.count(transactions.id),
+                    func.sum(transactions.price),
+                )
+                .where(
+                    transactions.id > start,
+                    transactions.id <= start + chunk,
+                    transactions.merchant_id.is_not(None),
+                    transactions.created_date.is_not(None),
+                )
+                .group_by(*keys)
+            )
+            columns = [column.name for column in table.__table__.primary_key]
+            await session.exec(
+                _on_conflict_add(
+                    table,
+                    models.dialect_insert(session, table).from_select(
+                        columns + ["orders", "revenue"], rows
+                    ),
+                )
+            )
+        await session.commit()
+
+
+async def read(
+    session, merchant_id: int, start: datetime.date, end: datetime.date, top: int
+) -> models.MerchantStats:
+    """Days with sales between start and end inclusive, with their top items."""
+    daily = models.DBMerchantDailyStats
+    result = await session.exec(
+        select(daily.day, func.sum(daily.orders), func.sum(daily.revenue))
+        .where(daily.merchant_id == merchant_id, daily.day >= start, daily.day <= end)
+        .group_by(daily.day)
+        .order_by(daily.day)
+    )
+    days = {
+        day: models.DailySales(day=day, orders=orders, revenue=revenue)
+        for day, orders, revenue in result.all()
+    }
+
+    if top > 0 and days:
+        per_item = models.DBMerchantDailyItemStats
+        item_sales = (
+            select(
+                per_item.day,
+                per_item.item_id,
+                func.sum(per_item.orders).label("orders"),
+                func.sum(per_item.revenue).label("revenue"),
+            )
+            .where(
+                per_item.merchant_id == merchant_id,
+                per_item.day >= start,
+                per_item.day <= end,
+            )
+            .group_by(per_item.day, per_item.item_id)
+            .subquery()
+        )
+        ranked = select(
+            item_sales,
+            func.row_number()
+            .over(
+                partition_by=item_sales.c.day,
+                order_by=(item_sales.c.revenue.desc(), item_sales.c.item_id),
+            )
+            .label("rank"),
+        ).subquery()
+        result = await session.exec(
+            select(ranked.c.day, ranked.c.item_id, ranked.c.orders, ranked.c.revenue)
+            .where(ranked.c.rank <= top)
+            .order_by(ranked.c.day, ranked.c.rank)
+        )
+        for day, item_id, orders, revenue in result.all():
+            days[day].top_items.append(
+                models.ItemSales(item_id=item_id, orders=orders, revenue=revenue)
+            )
+
+    return models.MerchantStats(
+        merchant_id=merchant_id,
+        start=start,
+        end=end,
+        orders=sum(sales.orders for sales in days.values()),
+        revenue=sum(sales.revenue for sales in days.values()),
+        days=list(days.values()),
+    )
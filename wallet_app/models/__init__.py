@@ -1,10 +1,16 @@
+import asyncio
+import itertools
+import time
 from typing import Optional
 
 from sqlmodel import Field, SQLModel, create_engine, Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from sqlalchemy import make_url, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 
 from . import items
 from . import merchants
@@ -12,6 +18,9 @@ from . import transactions
 from . import wallets
 from . import users
 from . import customers
+from . import counters
+from . import merchant_stats
+from . import health
 
 from .items import *
 from .merchants import *
@@ -19,21 +28,111 @@ from .customers import *
 from .transactions import *
 from .wallets import *
 from .users import *
+from .counters import *
+from .merchant_stats import *
+from .health import *
 
 
 connect_args = {}
 
 engine = None
 
+replica_engines = []
+replica_retry = 30.0
+_replica_down_until = {}
+_next_replica = itertools.count()
+
 
 def init_db(settings):
-    global engine
+    global engine, replica_engines, replica_retry
+
+    engine = _create_engine(settings.SQLDB_URL, settings)
+    replica_engines = [
+        _create_engine(url.strip(), settings)
+        for url in settings.SQLDB_REPLICA_URLS.split(",")
+        if url.strip()
+    ]
+    replica_retry = settings.SQLDB_REPLICA_RETRY
+
+
+def _create_engine(url, settings):
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # every connection would get its own empty in-memory database
+        return create_async_engine(
+            url,
+            echo=settings.SQLDB_ECHO,
+            future=True,
+            connect_args=connect_args,
+            poolclass=StaticPool,
+        )
 
-    engine = create_async_engine(
-        settings.SQLDB_URL,
-        echo=True,
+    return create_async_engine(
+        url,
+        echo=settings.SQLDB_ECHO,
         future=True,
         connect_args=connect_args,
+        # also for file SQLite, which would otherwise get a NullPool
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.SQLDB_POOL_SIZE,
+        max_overflow=settings.SQLDB_MAX_OVERFLOW,
+        pool_timeout=settings.SQLDB_POOL_TIMEOUT,
+        pool_recycle=settings.SQLDB_POOL_RECYCLE,
+        pool_pre_ping=settings.SQLDB_POOL_PRE_PING,
+    )
+
+
+async def warm_up(connections: int):
+    """Open connections up front so the first requests don't pay for it."""
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+async def dispose():
+    await engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
+
+
+def read_engine():
+    """Next healthy replica round-robin, or the primary if there is none."""
+    now = time.monotonic()
+    for _ in range(len(replica_engines)):
+        replica_engine = replica_engines[next(_next_replica) % len(replica_engines)]
+        if _replica_down_until.get(replica_engine, 0) <= now:
+            return replica_engine
+    return engine
+
+
+def mark_replica_down(replica_engine):
+    _replica_down_until[replica_engine] = time.monotonic() + replica_retry
+
+
+async def database_health() -> DatabaseHealth:
+    pool = engine.pool
+
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    latency = time.perf_counter() - started
+
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        # in-memory SQLite's single shared connection has nothing to report
+        return DatabaseHealth(status="ok", latency_ms=latency * 1000)
+
+    return DatabaseHealth(
+        status="ok",
+        latency_ms=latency * 1000,
+        pool=PoolStatus(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        ),
     )
 
 
@@ -43,7 +142,32 @@ async def recreate_all():
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
+def dialect_insert(session, table):
+    """insert() for the session's dialect, so callers get on_conflict_do_*."""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
 async def get_session() -> AsyncSession: # type: ignore
     async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_read_session() -> AsyncSession: # type: ignore
+    """Session for read-only routes, served by a replica when configured."""
+    bind = read_engine()
+    try:
+        conn = await bind.connect()
+    except Exception:
+        if bind is engine:
+            raise
+        mark_replica_down(bind)
+        conn = await engine.connect()
+
+    try:
+        async with AsyncSession(conn, expire_on_commit=False) as session:
+            yield session
+    finally:
+        await conn.close()
\ No newline at end of file
@@ -0,0 +1,13 @@
+from sqlmodel import Field, SQLModel
+
+
+class DBCounter(SQLModel, table=True):
+    __tablename__ = "counters"
+
+    name: str = Field(primary_key=True)
+    # 0 is the table-wide counter, otherwise the merchant id
+    scope_id: int = Field(default=0, primary_key=True)
+    # a counter is the sum of its shard rows, see COUNTER_SHARDS
+    shard: int = Field(default=0, primary_key=True)
+
+    value: int = Field(default=0)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+
+
+class DatabaseHealth(BaseModel):
+    status: str
+    latency_ms: float
+    pool: PoolStatus | None = None
@@ -1,7 +1,10 @@
+import datetime
 from typing import Optional
 
+import pydantic
 from pydantic import BaseModel, ConfigDict
-from sqlmodel import Field, SQLModel, Relationship
+from sqlalchemy import DDL, event
+from sqlmodel import Field, SQLModel, Relationship, Index
 
 from . import users
 from . import merchants
@@ -35,6 +38,12 @@ class Item(BaseItem):
 
 class DBItem(BaseItem, SQLModel, table=True):
     __tablename__ = "items"
+    __table_args__ = (
+        Index("ix_items_price_id", "price", "id"),
+        Index("ix_items_name_id", "name", "id"),
+        Index("ix_items_merchant_id_id", "merchant_id", "id"),
+        Index("ix_items_merchant_price_id", "merchant_id", "price", "id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
 
@@ -46,16 +55,81 @@ class DBItem(BaseItem, SQLModel, table=True):
     user_id: int = Field(default=None, foreign_key="users.id")
     # user: users.DBUser | None = Relationship()
     user: users.DBUser | None = Relationship(back_populates="items")
-    
-    
-    
-    
+
+    updated_date: datetime.datetime | None = Field(default_factory=datetime.datetime.now)
+
+
+# GET /items/search: FTS5 on SQLite, kept in sync by triggers; a GIN
+# tsvector expression index on PostgreSQL (search.py repeats the expression)
+SEARCH_VECTOR = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+        "name, description, content='items', content_rowid='id')",
+        "CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN "
+        "INSERT INTO items_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END",
+        "CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); END",
+        "CREATE TRIGGER items_fts_update AFTER UPDATE OF name, description ON items BEGIN "
+        "INSERT INTO items_fts(items_fts, rowid, name, description) "
+        "VALUES ('delete', old.id, old.name, old.description); "
+        "INSERT INTO items_fts(rowid, name, description) "
+        "VALUES (new.id, new.name, new.description); END",
+    ],
+    "postgresql": [
+        f"CREATE INDEX IF NOT EXISTS ix_items_search ON items USING gin ({SEARCH_VECTOR})",
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            DBItem.__table__, "after_create", DDL(statement).execute_if(dialect=dialect)
+        )
+event.listen(
+    DBItem.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS items_fts").execute_if(dialect="sqlite"),
+)
+
 
 class ItemList(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
     items: list[Item]
-    page: int
-    page_count: int
+    page: int | None = None  # None on cursor pages
+    page_count: int | None = None  # None when it can't be counted cheaply
     size_per_page: int
+    next_cursor: str | None = None
+    truncated: bool = False  # search only ranked its newest candidates
+
+
+
+class ItemImportError(BaseModel):
+    line: int
+    error: str
+
+
+class ItemImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[ItemImportError]
+
+
+class ItemPriceUpdate(BaseModel):
+    id: int
+    price: float | None = pydantic.Field(default=None, ge=0)
+    tax: float | None = pydantic.Field(default=None, ge=0)
+
+
+class ItemPriceUpdates(BaseModel):
+    # a null price or tax leaves the current value unchanged
+    items: list[ItemPriceUpdate] = pydantic.Field(min_length=1, max_length=10_000)
+
 
+class ItemPriceUpdateResult(BaseModel):
+    updated: int
+    not_found: list[int]
@@ -0,0 +1,54 @@
+import datetime
+
+from pydantic import BaseModel, ConfigDict
+from sqlmodel import Field, SQLModel
+
+
+class DBMerchantDailyStats(SQLModel, table=True):
+    __tablename__ = "merchant_daily_stats"
+
+    merchant_id: int = Field(primary_key=True)
+    day: datetime.date = Field(primary_key=True)
+    # a day's sales are the sum of its shard rows, see COUNTER_SHARDS
+    shard: int = Field(default=0, primary_key=True)
+
+    orders: int = Field(default=0)
+    revenue: float = Field(default=0)
+
+
+class DBMerchantDailyItemStats(SQLModel, table=True):
+    __tablename__ = "merchant_daily_item_stats"
+
+    merchant_id: int = Field(primary_key=True)
+    day: datetime.date = Field(primary_key=True)
+    item_id: int = Field(primary_key=True)
+    shard: int = Field(default=0, primary_key=True)
+
+    orders: int = Field(default=0)
+    revenue: float = Field(default=0)
+
+
+class ItemSales(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    item_id: int
+    orders: int
+    revenue: float
+
+
+class DailySales(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    day: datetime.date
+    orders: int
+    revenue: float
+    top_items: list[ItemSales] = []
+
+
+class MerchantStats(BaseModel):
+    merchant_id: int
+    start: datetime.date
+    end: datetime.date
+    orders: int
+    revenue: float
+    days: list[DailySales]
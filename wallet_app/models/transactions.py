@@ -1,5 +1,7 @@
+import datetime
 from typing import Optional
 
+import pydantic
 from pydantic import BaseModel, ConfigDict
 from sqlmodel import Field, SQLModel, Relationship
 
@@ -19,6 +21,14 @@ class CreatedTransaction(BaseTransaction):
 class UpdatedTransaction(BaseTransaction):
     pass
 
+class CartItem(BaseModel):
+    item_id: int
+    quantity: int = pydantic.Field(default=1, ge=1, le=100)
+
+class CreatedCart(BaseModel):
+    items: list[CartItem] = pydantic.Field(min_length=1, max_length=100)
+    description: str | None = None
+
 class Transaction(BaseTransaction):
     id: int
     price: float
@@ -36,6 +46,8 @@ class DBTransaction(BaseTransaction, SQLModel, table=True):
     merchant_id: int = Field(default=None)
     
     customer_id: int = Field(default=None)
+
+    created_date: datetime.datetime | None = Field(default_factory=datetime.datetime.now)
     
     
 
@@ -2,13 +2,12 @@ import datetime
 
 import pydantic
 from pydantic import BaseModel, EmailStr, ConfigDict
-from sqlmodel import SQLModel, Field, Relationship
-
-from passlib.context import CryptContext
+from sqlalchemy import func, or_, text
+from sqlmodel import SQLModel, Field, Relationship, Index
 
 from enum import Enum
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .. import passwords
 
 class UserRole(str, Enum):
     merchant = "merchant"
@@ -26,6 +25,7 @@ class BaseUser(BaseModel):
 class User(BaseUser):
     id: int
     role: UserRole
+    status: str = "active"
     
     last_login_date: datetime.datetime | None = pydantic.Field(
         example="2023-01-01T00:00:00.000000", default=None
@@ -70,6 +70,11 @@ class UpdatedUser(BaseUser):
     #roles: list[str]
     pass
 
+
+class UpdatedUserStatus(BaseModel):
+    role: UserRole | None = None
+    status: str | None = None
+
 class Token(BaseModel):
     access_token: str
     refresh_token: str
@@ -84,6 +89,47 @@ class TokenData(BaseModel):
     user_id: str | None = None
 
 
+class TokenClaims(BaseModel):
+    """Signed access token payload.
+
+    Carries the user's id, role and status for authorization without a
+    database read; names and email stay out of the token.
+    """
+
+    sub: int
+    jti: str | None = None
+    exp: int | None = None
+    iat: float | None = None
+
+    role: UserRole | None = None
+    status: str | None = None
+
+    merchant_id: int | None = None
+    customer_id: int | None = None
+    wallet_id: int | None = None
+
+    # refresh tokens only
+    typ: str | None = None
+    fam: str | None = None
+
+    def user_claims(self) -> dict:
+        """The claims to carry over into a new token."""
+        data = self.model_dump(mode="json", exclude={"jti", "exp", "iat", "typ", "fam"})
+        data["sub"] = str(self.sub)
+        return data
+
+    def is_stateless(self) -> bool:
+        return self.role is not None and self.status is not None
+
+    def to_user(self) -> User:
+        """A User with id, role and status only; the other fields are unset."""
+        return User.model_construct(id=self.sub, role=self.role, status=self.status)
+
+
+class RefreshedToken(BaseModel):
+    refresh_token: str
+
+
 class ChangedPasswordUser(BaseModel):
     current_password: str
     new_password: str
@@ -91,11 +137,16 @@ class ChangedPasswordUser(BaseModel):
 
 class DBUser(BaseUser, SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("uq_users_username_lower", text("lower(username)"), unique=True),
+        Index("uq_users_email_lower", text("lower(email)"), unique=True),
+    )
     id: int | None = Field(default=None, primary_key=True)
 
     password: str
     
     role: UserRole = Field(default=None)
+    status: str = Field(default="active")
     
     items: list["DBItem"] = Relationship(back_populates="user", cascade_delete=True)
     wallets: list["DBWallet"] = Relationship(back_populates="user", cascade_delete=True)
@@ -106,6 +157,8 @@ class DBUser(BaseUser, SQLModel, table=True):
     register_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
     updated_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
     last_login_date: datetime.datetime | None = Field(default=None)
+    # tokens issued before this are rejected, see revocations.revoke_user()
+    tokens_valid_after: datetime.datetime | None = Field(default=None, index=True)
 
     async def has_roles(self, roles):
         for role in roles:
@@ -114,11 +167,44 @@ class DBUser(BaseUser, SQLModel, table=True):
         return False
 
     async def set_password(self, plain_password):
-        self.password = pwd_context.hash(plain_password)
+        self.password = await passwords.hash(plain_password)
 
     async def verify_password(self, plain_password):
-        print(plain_password, self.password)
-        return pwd_context.verify(plain_password, self.password)
+        # a hash with an outdated scheme or cost is replaced, the caller commits
+        verified, new_hash = await passwords.verify(plain_password, self.password)
+        if verified and new_hash:
+            self.password = new_hash
+        return verified
 
     async def is_use_citizen_id_as_password(self):
-        return pwd_context.verify(self.citizen_id, self.password)
\ No newline at end of file
+        verified, _ = await passwords.verify(self.citizen_id, self.password)
+        return verified
+
+
+def matches_login(username: str, email: str):
+    """WHERE clause served by the lower(username) and lower(email) indexes."""
+    return or_(
+        func.lower(DBUser.username) == username.lower(),
+        func.lower(DBUser.email) == email.lower(),
+    )
+
+
+class DBRevokedToken(SQLModel, table=True):
+    __tablename__ = "revoked_tokens"
+
+    jti: str = Field(primary_key=True)
+    user_id: int = Field(default=None, index=True)
+    expires_at: datetime.datetime = Field(index=True)
+
+
+
+class DBRefreshTokenFamily(SQLModel, table=True):
+    """One row per login; each refresh replaces current_jti."""
+
+    __tablename__ = "refresh_token_families"
+
+    family_id: str = Field(primary_key=True)
+    user_id: int = Field(default=None, index=True)
+    current_jti: str
+    revoked: bool = Field(default=False)
+    expires_at: datetime.datetime
@@ -27,11 +27,20 @@ class DBWallet(BaseWallet, SQLModel, table=True):
     
     id: Optional[int] = Field(default=None, primary_key=True)
     
-    user_id: int = Field(default=None, foreign_key="users.id")
+    user_id: int = Field(default=None, foreign_key="users.id", index=True)
     # user: users.DBUser | None = Relationship()
     user: users.DBUser | None = Relationship(back_populates="wallets")
     
 
+class DBWalletShard(SQLModel, table=True):
+    __tablename__ = "wallet_shards"
+
+    wallet_id: int = Field(foreign_key="wallets.id", primary_key=True)
+    shard: int = Field(primary_key=True)
+
+    balance: float = Field(default=0)
+
+
 class WalletList(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -0,0 +1,76 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, tuple_
+
+
+def encode_cursor(sort: str, key, row_id: int) -> str:
+    raw = json.dumps([sort, key, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+    if cursor_sort != sort:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor does not match sort order",
+        )
+    return key, row_id
+
+
+def _check_type(value, column):
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        # sqlmodel's AutoString, or an untyped expression such as a rank
+        python_type = str if isinstance(column.type, String) else (int, float)
+    if python_type is float and isinstance(value, int):
+        value = float(value)
+    if isinstance(value, bool) or not isinstance(value, python_type):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return value
+
+
+def keyset(statement, sort_column, id_column, cursor: str | None, sort: str, limit: int):
+    """Seek past the (sort_key, id) pair stored in cursor instead of OFFSET.
+
+    One extra row is fetched so the caller can tell whether a next page exists.
+    """
+    if cursor:
+        key, row_id = decode_cursor(cursor, sort)
+        # a tampered cursor must not reach the database as the wrong type
+        key = _check_type(key, sort_column)
+        row_id = _check_type(row_id, id_column)
+        if sort_column is id_column:
+            statement = statement.where(id_column > row_id)
+        else:
+            statement = statement.where(
+                tuple_(sort_column, id_column) > tuple_(key, row_id)
+            )
+
+    if sort_column is id_column:
+        statement = statement.order_by(id_column)
+    else:
+        statement = statement.order_by(sort_column, id_column)
+
+    return statement.limit(limit + 1)
+
+
+def next_cursor(rows: list, sort: str, limit: int) -> tuple[list, str | None]:
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, sort), last.id)
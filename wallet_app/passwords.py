@@ -0,0 +1,88 @@
+"""Password hashing off the event loop.
+
+bcrypt takes tens of milliseconds per call, so hashes are computed in a
+process pool and at most PASSWORD_HASH_CONCURRENCY of them are queued per
+app process. PASSWORD_HASH_WORKERS=0 hashes inline, blocking the event loop.
+
+Stored hashes made with another scheme or bcrypt cost are reported by
+verify() so the caller can store the rehash.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from . import config
+
+
+settings = config.get_settings()
+
+# argon2 needs the argon2-cffi package installed
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    default=settings.PASSWORD_SCHEME,
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+executor: ProcessPoolExecutor | None = None
+
+# created on first use, so it belongs to the loop that serves the app
+limit: asyncio.Semaphore | None = None
+limit_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _hash(plain_password: str) -> str:
+    return pwd_context.hash(plain_password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _executor() -> ProcessPoolExecutor:
+    global executor
+
+    if executor is None:
+        executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return executor
+
+
+def _limit() -> asyncio.Semaphore:
+    global limit, limit_loop
+
+    loop = asyncio.get_running_loop()
+    if limit is None or limit_loop is not loop:
+        limit = asyncio.Semaphore(settings.PASSWORD_HASH_CONCURRENCY)
+        limit_loop = loop
+    return limit
+
+
+async def _run(function, *args):
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return function(*args)
+
+    async with _limit():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor(), function, *args)
+
+
+async def hash(plain_password: str) -> str:
+    return await _run(_hash, plain_password)
+
+
+async def verify(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Returns (matches, new hash if the stored one should be replaced)."""
+    return await _run(_verify, plain_password, hashed_password)
+
+
+def shutdown():
+    global executor
+
+    if executor is not None:
+        executor.shutdown(cancel_futures=True)
+        executor = None
@@ -0,0 +1,151 @@
+import datetime
+from collections import Counter, defaultdict
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+
+from . import balances
+from . import counters
+from . import merchant_stats
+from . import models
+
+
+async def resolve(session, user_id: int, item_id: int):
+    """Item price and every id a purchase needs, in one query."""
+    merchant_wallet = aliased(models.DBWallet)
+    customer_wallet = aliased(models.DBWallet)
+
+    result = await session.exec(
+        select(
+            models.DBItem.price,
+            models.DBItem.merchant_id,
+            merchant_wallet.id,
+            customer_wallet.id,
+            models.DBCustomer.id,
+        )
+        .select_from(models.DBItem)
+        .outerjoin(merchant_wallet, merchant_wallet.user_id == models.DBItem.user_id)
+        .outerjoin(customer_wallet, customer_wallet.user_id == user_id)
+        .outerjoin(models.DBCustomer, models.DBCustomer.user_id == user_id)
+        .where(models.DBItem.id == item_id)
+    )
+    row = result.one_or_none()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    price, merchant_id, merchant_wallet_id, customer_wallet_id, customer_id = row
+    if customer_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="You not customer"
+        )
+    if merchant_wallet_id is None or customer_wallet_id is None:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    return row
+
+
+async def purchase(
+    session, user_id: int, transaction: models.CreatedTransaction
+) -> models.DBTransaction:
+    """Charge the customer, pay the merchant and record the transaction.
+
+    Does not commit; the caller owns the transaction.
+    """
+    price, merchant_id, merchant_wallet_id, customer_wallet_id, customer_id = (
+        await resolve(session, user_id, transaction.item_id)
+    )
+
+    await balances.transfer(session, customer_wallet_id, merchant_wallet_id, price)
+
+    dbtransaction = models.DBTransaction.from_orm(transaction)
+    dbtransaction.price = price
+    dbtransaction.merchant_id = merchant_id
+    dbtransaction.customer_id = customer_id
+    session.add(dbtransaction)
+
+    await counters.track(session, counters.TRANSACTIONS, merchant_id)
+    await merchant_stats.track(
+        session,
+        dbtransaction.created_date.date(),
+        [(merchant_id, transaction.item_id, price, 1)],
+    )
+    return dbtransaction
+
+
+async def purchase_many(
+    session, user_id: int, cart: models.CreatedCart
+) -> list[models.DBTransaction]:
+    """Buy every item in the cart in one database transaction.
+
+    The customer is debited once, each merchant wallet is credited once and
+    one transaction row per unit is inserted in a single statement.
+    Does not commit; the caller owns the transaction.
+    """
+    quantities = Counter()
+    for line in cart.items:
+        quantities[line.item_id] += line.quantity
+
+    result = await session.exec(
+        select(models.DBWallet.id, models.DBCustomer.id)
+        .join(models.DBCustomer, models.DBCustomer.user_id == models.DBWallet.user_id)
+        .where(models.DBWallet.user_id == user_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="You not customer"
+        )
+    customer_wallet_id, customer_id = row
+
+    result = await session.exec(
+        select(
+            models.DBItem.id,
+            models.DBItem.price,
+            models.DBItem.merchant_id,
+            models.DBWallet.id,
+        )
+        .outerjoin(models.DBWallet, models.DBWallet.user_id == models.DBItem.user_id)
+        .where(models.DBItem.id.in_(list(quantities)))
+    )
+    items = {item_id: rest for item_id, *rest in result.all()}
+
+    missing = sorted(set(quantities) - set(items))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Item not found: {missing}")
+
+    now = datetime.datetime.now()
+    credits = defaultdict(float)
+    per_merchant = Counter()
+    sales = []
+    rows = []
+    for item_id, quantity in quantities.items():
+        price, merchant_id, merchant_wallet_id = items[item_id]
+        if merchant_wallet_id is None:
+            raise HTTPException(status_code=404, detail="Wallet not found")
+
+        credits[merchant_wallet_id] += price * quantity
+        per_merchant[merchant_id] += quantity
+        sales.append((merchant_id, item_id, price, quantity))
+        rows += [
+            dict(
+                item_id=item_id,
+                description=cart.description,
+                price=price,
+                merchant_id=merchant_id,
+                customer_id=customer_id,
+                created_date=now,
+            )
+        ] * quantity
+
+    await balances.settle(session, customer_wallet_id, credits)
+
+    result = await session.exec(
+        insert(models.DBTransaction).returning(models.DBTransaction), params=rows
+    )
+    dbtransactions = list(result.scalars())
+
+    await counters.track_many(session, counters.TRANSACTIONS, per_merchant)
+    await merchant_stats.track(session, now.date(), sales)
+    return dbtransactions
@@ -0,0 +1,29 @@
+"""Read-only list queries that bypass the ORM.
+
+Only the columns named by the response schema are selected, and the
+statement runs on the session's connection, so no instances are built,
+nothing enters the identity map and nothing is change-tracked. Rows come
+back as plain dicts for responses.RowsResponse.
+"""
+from sqlmodel import select
+
+from . import exports
+
+
+def select_columns(schema, table):
+    """select() of the table columns matching schema's fields."""
+    return select(*exports.columns_for(schema, table))
+
+
+async def fetch_rows(session, statement) -> list:
+    connection = await session.connection()
+    result = await connection.execute(statement)
+    return result.all()
+
+
+def as_dicts(rows) -> list[dict]:
+    return [row._asdict() for row in rows]
+
+
+async def fetch_dicts(session, statement) -> list[dict]:
+    return as_dicts(await fetch_rows(session, statement))
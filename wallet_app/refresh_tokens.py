@@ -0,0 +1,62 @@
+"""Refresh token rotation.
+
+Every login starts a token family. A refresh token is only accepted while
+its jti is the family's current one, and using it moves the family on to
+a new jti in the same UPDATE. Presenting an already rotated token means it
+was copied, so the whole family is revoked.
+"""
+import datetime
+import uuid
+
+from sqlalchemy import update
+
+from . import models
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_family(session, user_id: int, jti: str, expires_at: datetime.datetime) -> str:
+    """Does not commit."""
+    family_id = new_id()
+    session.add(
+        models.DBRefreshTokenFamily(
+            family_id=family_id, user_id=user_id, current_jti=jti, expires_at=expires_at
+        )
+    )
+    return family_id
+
+
+async def rotate(
+    session, claims: models.TokenClaims, new_jti: str
+) -> datetime.datetime | None:
+    """Returns when the family expires, or None if the token was not accepted."""
+    family = models.DBRefreshTokenFamily
+    result = await session.exec(
+        update(family)
+        .where(
+            family.family_id == claims.fam,
+            family.current_jti == claims.jti,
+            family.revoked == False,  # noqa: E712
+            family.expires_at > datetime.datetime.now(),
+        )
+        .values(current_jti=new_jti)
+        .returning(family.expires_at)
+    )
+    return result.scalar_one_or_none()
+
+
+async def revoke_family(session, family_id: str):
+    family = models.DBRefreshTokenFamily
+    await session.exec(
+        update(family).where(family.family_id == family_id).values(revoked=True)
+    )
+
+
+async def revoke_user_families(session, user_id: int):
+    """Ends every login of a user. Does not commit."""
+    family = models.DBRefreshTokenFamily
+    await session.exec(
+        update(family).where(family.user_id == user_id).values(revoked=True)
+    )
@@ -0,0 +1,29 @@
+"""JSON responses.
+
+A handler that already holds a validated model returns ModelResponse(model):
+the model's compiled pydantic-core serializer writes the JSON bytes, and
+FastAPI does not validate and re-encode the model against the route's
+response_model a second time. Everything else goes out through orjson.
+RowsResponse encodes plain dicts and lists, e.g. rows from readers.py, with
+pydantic-core and no model at all.
+"""
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+DefaultResponse = ORJSONResponse
+
+
+class ModelResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
+
+
+class RowsResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return to_json(content)
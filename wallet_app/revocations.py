@@ -0,0 +1,98 @@
+"""Revoked access tokens, checked in memory on every request.
+
+The revoked_tokens table only holds tokens that have not expired yet, so
+the set stays small; each worker reloads it every
+REVOCATION_REFRESH_INTERVAL seconds and adds its own revocations at once.
+revoke_user() ends every token of a user at once through the user's
+tokens_valid_after, loaded the same way while tokens issued before it can
+still be unexpired.
+"""
+import asyncio
+import datetime
+import logging
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlmodel import select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from . import config
+from . import models
+
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+revoked: frozenset[str] = frozenset()
+# user id -> timestamp; tokens of the user issued earlier are rejected
+valid_after: dict[int, float] = {}
+
+
+def is_revoked(claims: models.TokenClaims) -> bool:
+    if claims.jti is not None and claims.jti in revoked:
+        return True
+    cutoff = valid_after.get(claims.sub)
+    return cutoff is not None and (claims.iat or 0) < cutoff
+
+
+async def revoke(session, claims: models.TokenClaims):
+    """Revoke a token until it expires. Does not commit."""
+    global revoked
+
+    if claims.jti is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This token has no id and cannot be revoked",
+        )
+
+    expires_at = datetime.datetime.fromtimestamp(claims.exp or 0)
+    session.add(
+        models.DBRevokedToken(jti=claims.jti, user_id=claims.sub, expires_at=expires_at)
+    )
+    revoked = revoked | {claims.jti}
+
+
+async def revoke_user(session, user_id: int):
+    """Reject every token issued to the user so far, e.g. after a password
+    or role change. Does not commit."""
+    now = datetime.datetime.now()
+    await session.exec(
+        update(models.DBUser)
+        .where(models.DBUser.id == user_id)
+        .values(tokens_valid_after=now)
+        .execution_options(synchronize_session=False)
+    )
+    valid_after[user_id] = now.timestamp()
+
+
+async def load(session):
+    global revoked, valid_after
+
+    now = datetime.datetime.now()
+    await session.exec(
+        delete(models.DBRevokedToken).where(models.DBRevokedToken.expires_at <= now)
+    )
+    await session.commit()
+
+    result = await session.exec(select(models.DBRevokedToken.jti))
+    revoked = frozenset(result.all())
+
+    # older cutoffs only concern access tokens that have expired anyway
+    oldest = now - datetime.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    result = await session.exec(
+        select(models.DBUser.id, models.DBUser.tokens_valid_after).where(
+            models.DBUser.tokens_valid_after > oldest
+        )
+    )
+    valid_after = {user_id: cutoff.timestamp() for user_id, cutoff in result.all()}
+
+
+async def refresh_forever(interval: float):
+    while True:
+        try:
+            async with AsyncSession(models.engine) as session:
+                await load(session)
+        except Exception:
+            logger.exception("loading revoked tokens failed")
+        await asyncio.sleep(interval)
@@ -5,6 +5,7 @@ from . import wallets
 from . import buy_items
 from . import users
 from . import authentication
+from . import health
 
 def init_router(app):
     app.include_router(users.router)
@@ -13,4 +14,5 @@ def init_router(app):
     app.include_router(merchants.router)
     app.include_router(transactions.router)
     app.include_router(wallets.router)
-    app.include_router(buy_items.router)
\ No newline at end of file
+    app.include_router(buy_items.router)
+    app.include_router(health.router)
\ No newline at end of file
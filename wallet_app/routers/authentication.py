@@ -7,12 +7,17 @@ from fastapi.security import (
 )
 
 
+from sqlalchemy import case, func
 from sqlmodel import select
 from typing import Annotated
 import datetime
 
 from .. import config
+from .. import deps
+from .. import login_activity
 from .. import models
+from .. import refresh_tokens
+from .. import revocations
 from .. import security
 
 router = APIRouter(tags=["authentication"])
@@ -28,53 +33,121 @@ async def authentication(
     session: Annotated[models.AsyncSession, Depends(models.get_session)],
 ) -> models.Token:
 
+    # one query for username or email, a username match wins
+    login = form_data.username.lower()
     result = await session.exec(
-        select(models.DBUser).where(models.DBUser.username == form_data.username)
+        select(models.DBUser)
+        .where(models.matches_login(login, login))
+        .order_by(case((func.lower(models.DBUser.username) == login, 0), else_=1))
+        .limit(1)
     )
+    user = result.first()
 
-    user = result.one_or_none()
-
-    if not user:
-        result = await session.exec(
-            select(models.DBUser).where(models.DBUser.email == form_data.username)
-        )
-        user = result.one_or_none()
-
-    print("user", user)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
 
-    print("userx", user, await user.verify_password(form_data.password))
     if not await user.verify_password(form_data.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
 
-    user.last_login_date = datetime.datetime.now()
+    claims = await _user_claims(session, user)
+
+    refresh_jti = refresh_tokens.new_id()
+    family_id = refresh_tokens.start_family(
+        session, user.id, refresh_jti, _refresh_token_expires_at()
+    )
 
-    session.add(user)
     await session.commit()
-    await session.refresh(user)
+    login_activity.record(user.id)
+
+    return _issue_tokens(claims, family_id, refresh_jti)
+
+
+@router.post("/token/refresh")
+async def refresh_token(
+    token: models.RefreshedToken,
+    session: Annotated[models.AsyncSession, Depends(models.get_session)],
+) -> models.Token:
+    claims = deps.decode_claims(token.refresh_token)
+    if claims.typ != "refresh" or not claims.fam or not claims.jti:
+        raise deps.credentials_exception
+
+    refresh_jti = refresh_tokens.new_id()
+    expires_at = await refresh_tokens.rotate(session, claims, refresh_jti)
+    if expires_at is None:
+        # an old token of this family came back, assume it leaked
+        await refresh_tokens.revoke_family(session, claims.fam)
+        await session.commit()
+        raise deps.credentials_exception
+
+    # changing a user's role, status or password revokes their families, so
+    # a family that could still rotate carries current claims
+    await session.commit()
+    return _issue_tokens(
+        claims.user_claims(),
+        claims.fam,
+        refresh_jti,
+        refresh_expires_delta=expires_at - datetime.datetime.now(),
+    )
 
+
+async def _user_claims(session, user: models.DBUser) -> dict:
+    result = await session.exec(
+        select(models.DBMerchant.id, models.DBCustomer.id, models.DBWallet.id)
+        .select_from(models.DBUser)
+        .outerjoin(models.DBMerchant, models.DBMerchant.user_id == models.DBUser.id)
+        .outerjoin(models.DBCustomer, models.DBCustomer.user_id == models.DBUser.id)
+        .outerjoin(models.DBWallet, models.DBWallet.user_id == models.DBUser.id)
+        .where(models.DBUser.id == user.id)
+    )
+    merchant_id, customer_id, wallet_id = result.first()
+    return security.user_claims(user, merchant_id, customer_id, wallet_id)
+
+
+def _refresh_token_expires_at() -> datetime.datetime:
+    return datetime.datetime.now() + datetime.timedelta(
+        minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
+    )
+
+
+def _issue_tokens(
+    claims: dict,
+    family_id: str,
+    refresh_jti: str,
+    refresh_expires_delta: datetime.timedelta | None = None,
+) -> models.Token:
     access_token_expires = datetime.timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
+    issued_at = datetime.datetime.now()
     return models.Token(
         access_token=security.create_access_token(
-            data={"sub": user.id},
+            data=claims,
             expires_delta=access_token_expires,
         ),
         refresh_token=security.create_refresh_token(
-            data={"sub": user.id},
-            expires_delta=access_token_expires,
+            data=dict(claims, fam=family_id, jti=refresh_jti),
+            expires_delta=refresh_expires_delta,
         ),
         token_type="Bearer",
         scope="",
         expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
-        expires_at=datetime.datetime.now() + access_token_expires,
-        issued_at=user.last_login_date,
+        expires_at=issued_at + access_token_expires,
+        issued_at=issued_at,
     )
+
+
+@router.post("/token/revoke")
+async def revoke_token(
+    claims: Annotated[models.TokenClaims, Depends(deps.get_token_claims)],
+    session: Annotated[models.AsyncSession, Depends(models.get_session)],
+) -> dict:
+    await revocations.revoke(session, claims)
+    await session.commit()
+
+    return dict(message="revoke success")
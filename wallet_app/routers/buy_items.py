@@ -1,59 +1,64 @@
 from fastapi import APIRouter, HTTPException, Depends
 
 from typing import Optional, Annotated
-from sqlmodel import Field, SQLModel, create_engine, Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from .. import config
 from .. import deps
+from .. import group_commit
 from .. import models
+from .. import purchases
+from ..responses import ModelResponse
 
 
 router = APIRouter(prefix="/buy")
 
+settings = config.get_settings()
+
+
+async def purchase_session(
+    session: Annotated[AsyncSession, Depends(models.get_session)],
+) -> AsyncSession | None:
+    """The request's session, or None when purchases are group committed.
+
+    It is the session get_current_user loads the user with, so a purchase
+    holds one connection at most.
+    """
+    if settings.PURCHASE_GROUP_COMMIT:
+        # the batch commits on its own connection; hand back the one the
+        # user lookup may hold instead of keeping it while waiting
+        await session.close()
+        return None
+    return session
+
+
 @router.post("")
 async def buy_item(
     transaction: models.CreatedTransaction,
+    # resolved in this order, so the user is loaded before the session is
+    # handed back in group mode
+    current_user: Annotated[models.User, Depends(deps.get_current_user)],
+    session: Annotated[AsyncSession | None, Depends(purchase_session)],
+) -> models.Transaction:
+    if session is None:
+        return await group_commit.get_batcher().submit(current_user.id, transaction)
+
+    dbtransaction = await purchases.purchase(session, current_user.id, transaction)
+    await session.commit()
+
+    return models.Transaction.from_orm(dbtransaction)
+
+
+@router.post("/batch", response_model=models.TransactionList)
+async def buy_items(
+    cart: models.CreatedCart,
     session: Annotated[AsyncSession, Depends(models.get_session)],
     current_user: models.User = Depends(deps.get_current_user),
-):
-    result = await session.exec(
-        select(models.DBItem).where(models.DBItem.id == transaction.item_id)
-    )
-    dbitem = result.one_or_none()
-    
-
-    result = await session.exec(
-        select(models.DBWallet).where(models.DBWallet.user_id == dbitem.user_id)
-    )
-    merchant_wallet = result.one_or_none()
-    
-    result = await session.exec(
-        select(models.DBWallet).where(models.DBWallet.user_id == current_user.id)
-    )
+) -> ModelResponse:
+    dbtransactions = await purchases.purchase_many(session, current_user.id, cart)
+    await session.commit()
 
-    customer_wallet = result.one_or_none()
-    
-    result = await session.exec(
-        select(models.DBCustomer).where(models.DBCustomer.user_id == current_user.id)
+    transaction_list = models.TransactionList.from_orm(
+        dict(transactions=dbtransactions, page_size=0, page=0, size_per_page=0)
     )
-    dbcustomer = result.one_or_none()
-    
-    dbtransaction = models.DBTransaction.from_orm(transaction)
-    
-    price = dbitem.price
-    dbtransaction.price = price
-    dbtransaction.merchant_id = dbitem.merchant_id
-    dbtransaction.customer_id = dbcustomer.id
-    
-    merchant_wallet.balance += price
-    customer_wallet.balance -= price
-    
-    merchant_wallet.sqlmodel_update(merchant_wallet)
-    customer_wallet.sqlmodel_update(customer_wallet)
-    session.add(dbtransaction)
-    session.add(merchant_wallet)
-    session.add(customer_wallet)
-    await session.commit()
-    await session.refresh(dbtransaction)
-    
-    return models.Transaction.from_orm(dbtransaction)
\ No newline at end of file
+    return ModelResponse(transaction_list)
@@ -0,0 +1,35 @@
+import logging
+
+from fastapi import APIRouter, HTTPException, status
+
+from .. import deps
+from .. import item_cache
+from .. import models
+
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/db")
+async def database_health() -> models.DatabaseHealth:
+    try:
+        return await models.database_health()
+    except Exception:
+        # the error text can carry the DSN or host, so it only goes to the log
+        logger.exception("database health check failed")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable",
+        )
+
+
+@router.get("/user-cache")
+async def user_cache_health() -> dict:
+    return deps.user_cache_stats()
+
+
+@router.get("/item-cache")
+async def item_cache_health() -> dict:
+    return item_cache.cache.stats()
@@ -1,102 +1,238 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
 
-from typing import Optional, Annotated
+from typing import Optional, Annotated, Literal
 
 from sqlmodel import Field, SQLModel, create_engine, Session, select, func
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+import datetime
 import math
 
-from ..models import Item, CreatedItem, UpdatedItem, ItemList, DBItem, engine, DBMerchant, get_session, User
+from ..models import Item, CreatedItem, UpdatedItem, ItemList, DBItem, engine, DBMerchant, get_session, get_read_session, User, TokenClaims
+from ..models import ItemImportResult, ItemPriceUpdates, ItemPriceUpdateResult
+from .. import bulk_items
+from .. import config
+from .. import counters
 from .. import deps
+from .. import item_cache
+from .. import pagination
+from .. import readers
+from ..responses import ModelResponse, RowsResponse
+from .. import search
 
 
 router = APIRouter(prefix="/items")
 
+settings = config.get_settings()
+
 SIZE_PER_PAGE = 50
 
+SORT_COLUMNS = {"id": DBItem.id, "price": DBItem.price, "name": DBItem.name}
+
+
+async def get_merchant_id(
+    current_user: User, claims: TokenClaims, session: AsyncSession
+) -> int:
+    if current_user.role != "merchant":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You not merchant"
+        )
+
+    merchant_id = claims.merchant_id
+    if merchant_id is None:
+        statement = select(DBMerchant.id).where(DBMerchant.user_id == current_user.id)
+        result = await session.exec(statement)
+        merchant_id = result.first()
+    return merchant_id
+
+
 @router.post("")
 async def create_item(
     item_info: CreatedItem,
     current_user: Annotated[User, Depends(deps.get_current_user)],
+    claims: Annotated[TokenClaims, Depends(deps.get_token_claims)],
     session: Annotated[AsyncSession, Depends(get_session)],
     ) -> Item | None:
 
     
-    if current_user.role != "merchant" :
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You not merchant"
-        )
-        
-    statement = select(DBMerchant).where(DBMerchant.user_id == current_user.id)
-    result = await session.exec(statement)
-    dbmerchant = result.one_or_none()
+    merchant_id = await get_merchant_id(current_user, claims, session)
     
     dbitem = DBItem.from_orm(item_info)
-    dbitem.user = current_user
+    dbitem.user_id = current_user.id
     
-    dbitem.merchant_id = dbmerchant.id
+    dbitem.merchant_id = merchant_id
     
     session.add(dbitem)
+    await counters.track(session, counters.ITEMS, merchant_id)
     await session.commit()
     await session.refresh(dbitem)
 
     return Item.from_orm(dbitem)
 
 
-@router.get("/page/{page}")
-async def read_items(
-    page: int,
+@router.post("/bulk")
+async def import_items(
+    request: Request,
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    claims: Annotated[TokenClaims, Depends(deps.get_token_claims)],
     session: Annotated[AsyncSession, Depends(get_session)],
-) -> ItemList:
-    result = await session.exec(
-        select(DBItem).offset((page - 1) * SIZE_PER_PAGE).limit(SIZE_PER_PAGE)
+    format: bulk_items.ImportFormat | None = None,
+    batch_size: Annotated[int, Query(ge=1, le=10_000)] = settings.ITEM_IMPORT_BATCH_SIZE,
+) -> ItemImportResult:
+    """Import NDJSON or CSV (with a header row) items; format defaults from Content-Type."""
+    merchant_id = await get_merchant_id(current_user, claims, session)
+
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if content_type.startswith("text/csv") else "ndjson"
+
+    return await bulk_items.import_items(
+        session, request.stream(), format, current_user.id, merchant_id, batch_size
+    )
+
+
+@router.patch("/bulk")
+async def update_item_prices(
+    updates: ItemPriceUpdates,
+    current_user: Annotated[User, Depends(deps.get_current_user)],
+    claims: Annotated[TokenClaims, Depends(deps.get_token_claims)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> ItemPriceUpdateResult:
+    merchant_id = await get_merchant_id(current_user, claims, session)
+
+    result = await bulk_items.update_prices(session, merchant_id, updates.items)
+    await session.commit()
+    item_cache.invalidate(*(change.id for change in updates.items))
+    return result
+
+
+@router.get("", response_model=ItemList)
+async def list_items(
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=200)] = SIZE_PER_PAGE,
+    sort: Literal["id", "price", "name"] = "id",
+    merchant_id: int | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+) -> RowsResponse:
+    statement = readers.select_columns(Item, DBItem)
+    if merchant_id is not None:
+        statement = statement.where(DBItem.merchant_id == merchant_id)
+    if min_price is not None:
+        statement = statement.where(DBItem.price >= min_price)
+    if max_price is not None:
+        statement = statement.where(DBItem.price <= max_price)
+
+    statement = pagination.keyset(
+        statement, SORT_COLUMNS[sort], DBItem.id, cursor, sort, limit
+    )
+    rows = await readers.fetch_rows(session, statement)
+    rows, next_cursor = pagination.next_cursor(rows, sort, limit)
+
+    # RowsResponse skips response_model, so every ItemList key is set here
+    item_list = dict(
+        items=readers.as_dicts(rows),
+        page=None,
+        page_count=None,
+        size_per_page=limit,
+        next_cursor=next_cursor,
+        truncated=False,
+    )
+    # counters don't cover price ranges, so page_count stays None then
+    if min_price is None and max_price is None:
+        scope_id = merchant_id if merchant_id is not None else counters.GLOBAL_SCOPE
+        item_list["page_count"] = int(
+            math.ceil(await counters.get_count(session, counters.ITEMS, scope_id) / limit)
         )
-    items = result.all()
+    return RowsResponse(item_list)
+
+
+@router.get("/search", response_model=ItemList)
+async def search_items(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=200)] = SIZE_PER_PAGE,
+    merchant_id: int | None = None,
+) -> ModelResponse:
+    """Items whose name or description has words starting with every word of q, best first."""
+    return ModelResponse(
+        await search.search_items(session, q, merchant_id, cursor, limit)
+    )
+
+
+@router.get("/page/{page}", response_model=ItemList)
+async def read_items(
+    page: int,
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+) -> RowsResponse:
+    items = await readers.fetch_dicts(
+        session,
+        readers.select_columns(Item, DBItem)
+        .offset((page - 1) * SIZE_PER_PAGE)
+        .limit(SIZE_PER_PAGE),
+    )
 
     page_count = int(
-        math.ceil(
-            (await session.exec(select(func.count(DBItem.id)))).first()
-            / SIZE_PER_PAGE
-        )
+        math.ceil(await counters.get_count(session, counters.ITEMS) / SIZE_PER_PAGE)
     )
-    return ItemList.from_orm(
-        dict(items=items, page_count=page_count, page=page, size_per_page=SIZE_PER_PAGE)
+    return RowsResponse(
+        dict(
+            items=items,
+            page_count=page_count,
+            page=page,
+            size_per_page=SIZE_PER_PAGE,
+            next_cursor=None,
+            truncated=False,
+        )
     )
 
-@router.get("/page/{page}/page_size/{page_size}")
+@router.get("/page/{page}/page_size/{page_size}", response_model=ItemList)
 async def read_items(
     page: int,
     page_size: int,
-    session: Annotated[AsyncSession, Depends(get_session)],
-) -> ItemList:
-    result = await session.exec(
-        select(DBItem).offset((page - 1) * page_size).limit(page_size)
-        )
-    items = result.all()
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+) -> RowsResponse:
+    items = await readers.fetch_dicts(
+        session,
+        readers.select_columns(Item, DBItem)
+        .offset((page - 1) * page_size)
+        .limit(page_size),
+    )
 
     page_count = int(
-        math.ceil(
-            (await session.exec(select(func.count(DBItem.id)))).first()
-            / page_size
-        )
+        math.ceil(await counters.get_count(session, counters.ITEMS) / page_size)
     )
-    return ItemList.from_orm(
-        dict(items=items, page_count=page_count, page=page, size_per_page=page_size)
+    return RowsResponse(
+        dict(
+            items=items,
+            page_count=page_count,
+            page=page,
+            size_per_page=page_size,
+            next_cursor=None,
+            truncated=False,
+        )
     )
 
-@router.get("/item_id/{item_id}")
+@router.get("/item_id/{item_id}", response_model=Item)
 async def read_item(
     item_id: int,
-    session: Annotated[AsyncSession, Depends(get_session)],
-    ) -> Item:
-    db_item = await session.get(DBItem, item_id)
-    if db_item:
-        print(">>>", db_item)
-        return Item.from_orm(db_item)
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+    ) -> Response:
+    entry = await item_cache.get(item_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Item not found")
 
-    raise HTTPException(status_code=404, detail="Item not found")
+    headers = {"ETag": entry.etag}
+    if entry.last_modified:
+        headers["Last-Modified"] = entry.last_modified
+
+    if item_cache.not_modified(entry, if_none_match, if_modified_since):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
 
 
 @router.put("/{item_id}")
@@ -113,8 +249,10 @@ async def update_item(
 
     if db_item:
         db_item.sqlmodel_update(item)
+        db_item.updated_date = datetime.datetime.now()
         session.add(db_item)
         await session.commit()
+        item_cache.invalidate(item_id)
         await session.refresh(db_item)
 
         return Item.from_orm(db_item)
@@ -135,7 +273,9 @@ async def delete_item(
 
     if db_item:
         await session.delete(db_item)
+        await counters.track(session, counters.ITEMS, db_item.merchant_id, -1)
         await session.commit()
+        item_cache.invalidate(item_id)
         
         return dict(message="delete success")
     raise HTTPException(status_code=404, detail="Item not found")
\ No newline at end of file
@@ -1,18 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 
 from typing import Optional, Annotated
 
+import datetime
+
 from sqlmodel import Field, SQLModel, create_engine, Session, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from wallet_app.models.merchants import DBMerchant, Merchant
 
+from .. import config
+from .. import counters
 from .. import models
 from .. import deps
+from .. import exports
+from .. import item_cache
+from .. import merchant_stats
+from .. import readers
+from ..responses import RowsResponse
 
 
 router = APIRouter(prefix="/merchants")
 
+settings = config.get_settings()
+
+STATS_DAYS = 30
+
 
 @router.post("")
 async def create_merchant(
@@ -21,9 +34,8 @@ async def create_merchant(
     session: Annotated[AsyncSession, Depends(models.get_session)],
 ) -> models.Merchant:
     print("create_merchant", merchant)
-    data = merchant.dict()
-    dbmerchant = models.DBMerchant.parse_obj(data)
-    dbmerchant.user = current_user
+    dbmerchant = models.DBMerchant.from_orm(merchant)
+    dbmerchant.user_id = current_user.id
     session.add(dbmerchant)
     await session.commit()
     await session.refresh(dbmerchant)
@@ -31,21 +43,30 @@ async def create_merchant(
     return models.Merchant.from_orm(dbmerchant)
 
 
-@router.get("")
+@router.get("", response_model=models.MerchantList)
 async def read_merchants(
-    session: Annotated[AsyncSession, Depends(models.get_session)]
-) -> models.MerchantList:
-    result = await session.exec(select(models.DBMerchant))
-    merchants = result.all()
-
-    return models.MerchantList.from_orm(
+    session: Annotated[AsyncSession, Depends(models.get_read_session)]
+) -> RowsResponse:
+    merchants = await readers.fetch_dicts(
+        session, readers.select_columns(models.Merchant, models.DBMerchant)
+    )
+    return RowsResponse(
         dict(merchants=merchants, page_size=0, page=0, size_per_page=0)
     )
 
 
+@router.get("/export")
+async def export_merchants(
+    format: exports.ExportFormat = "ndjson",
+):
+    return exports.export_response(
+        models.Merchant, models.DBMerchant, format, "merchants"
+    )
+
+
 @router.get("/{merchant_id}")
 async def read_merchant(
-    merchant_id: int, session: Annotated[AsyncSession, Depends(models.get_session)]
+    merchant_id: int, session: Annotated[AsyncSession, Depends(models.get_read_session)]
 ) -> models.Merchant:
     
     result = await session.exec(
@@ -58,6 +79,47 @@ async def read_merchant(
     raise HTTPException(status_code=404, detail="Merchant not found")
 
 
+@router.get("/{merchant_id}/stats")
+async def read_merchant_stats(
+    merchant_id: int,
+    current_user: Annotated[models.User, Depends(deps.get_current_user)],
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
+    start: Annotated[datetime.date | None, Query(alias="from")] = None,
+    end: Annotated[datetime.date | None, Query(alias="to")] = None,
+    top: Annotated[int, Query(ge=0, le=20)] = 5,
+) -> models.MerchantStats:
+    """Orders, revenue and top items per day; from/to default to the last 30 days."""
+    result = await session.exec(
+        select(DBMerchant.user_id).where(DBMerchant.id == merchant_id)
+    )
+    owner_id = result.one_or_none()
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Merchant not found")
+    if (
+        owner_id != current_user.id
+        and current_user.role != models.UserRole.administrator
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not your merchant"
+        )
+
+    if end is None:
+        end = datetime.date.today()
+    if start is None:
+        start = end - datetime.timedelta(days=STATS_DAYS - 1)
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="from is after to"
+        )
+    if (end - start).days >= settings.MERCHANT_STATS_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.MERCHANT_STATS_MAX_DAYS} days per request",
+        )
+
+    return await merchant_stats.read(session, merchant_id, start, end, top)
+
+
 @router.put("/{merchant_id}")
 async def update_merchant(
     merchant_id: int,
@@ -89,7 +151,15 @@ async def delete_merchant(
     current_user: Annotated[models.User, Depends(deps.get_current_user)],
 ) -> dict:
     db_merchant = await session.get(DBMerchant, merchant_id)
+    # the merchant's items are deleted with it
+    result = await session.exec(
+        select(models.DBItem.id).where(models.DBItem.merchant_id == merchant_id)
+    )
+    item_ids = result.all()
     await session.delete(db_merchant)
+    await counters.forget_scope(session, counters.ITEMS, merchant_id)
+    await merchant_stats.forget(session, merchant_id)
     await session.commit()
+    item_cache.invalidate(*item_ids)
 
     return dict(message="delete success")
@@ -11,8 +11,14 @@ from ..models import (
     TransactionList,
     DBTransaction,
     engine,
-    get_session
+    get_session,
+    get_read_session,
 )
+from .. import counters
+from .. import exports
+from .. import merchant_stats
+from .. import readers
+from ..responses import RowsResponse
 
 router = APIRouter(prefix="/transactions")
 
@@ -25,26 +31,36 @@ async def create_transaction(
     data = transaction.dict()
     dbtransaction = DBTransaction(**data)
     session.add(dbtransaction)
+    await counters.track(session, counters.TRANSACTIONS, dbtransaction.merchant_id)
     await session.commit()
     await session.refresh(dbtransaction)
 
     # return transaction.parse_obj(dbtransaction.dict())
     return Transaction.from_orm(dbtransaction)
 
-@router.get("")
+@router.get("", response_model=TransactionList)
 async def read_transactions(
-    session: Annotated[AsyncSession, Depends(get_session)],
-    ) -> TransactionList:
-    result = await session.exec(select(DBTransaction))
-    if result:
-        transactions = result.all()
-        return TransactionList.from_orm(dict(transactions=transactions, page_size=0, page=0, size_per_page=0))
-    raise HTTPException(status_code=404, detail="Transaction not found")
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    ) -> RowsResponse:
+    transactions = await readers.fetch_dicts(
+        session, readers.select_columns(Transaction, DBTransaction)
+    )
+    return RowsResponse(
+        dict(transactions=transactions, page_size=0, page=0, size_per_page=0)
+    )
+
+@router.get("/export")
+async def export_transactions(
+    format: exports.ExportFormat = "ndjson",
+    ):
+    return exports.export_response(
+        Transaction, DBTransaction, format, "transactions"
+    )
 
 @router.get("/{transaction_id}")
 async def read_transaction(
     transaction_id: int,
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
     ) -> Transaction:
     db_transaction = await session.get(DBTransaction, transaction_id)
     if db_transaction:
@@ -61,8 +77,33 @@ async def update_transaction(
     db_transaction = await session.get(DBTransaction, transaction_id)
     if db_transaction:
         print("update_transaction", transaction)
+        old_item_id = db_transaction.item_id
         db_transaction.sqlmodel_update(data)
         session.add(db_transaction)
+        # the sale moves to the new item in the merchant's rollups
+        if (
+            db_transaction.item_id != old_item_id
+            and db_transaction.merchant_id is not None
+            and db_transaction.created_date
+        ):
+            await merchant_stats.track(
+                session,
+                db_transaction.created_date.date(),
+                [
+                    (
+                        db_transaction.merchant_id,
+                        old_item_id,
+                        db_transaction.price,
+                        -1,
+                    ),
+                    (
+                        db_transaction.merchant_id,
+                        db_transaction.item_id,
+                        db_transaction.price,
+                        1,
+                    ),
+                ],
+            )
         await session.commit()
         await session.refresh(db_transaction)
         return Transaction.from_orm(db_transaction)
@@ -76,6 +117,22 @@ async def delete_transaction(
     db_transaction = await session.get(DBTransaction, transaction_id)
     if db_transaction:
         await session.delete(db_transaction)
+        await counters.track(
+            session, counters.TRANSACTIONS, db_transaction.merchant_id, -1
+        )
+        if db_transaction.merchant_id is not None and db_transaction.created_date:
+            await merchant_stats.track(
+                session,
+                db_transaction.created_date.date(),
+                [
+                    (
+                        db_transaction.merchant_id,
+                        db_transaction.item_id,
+                        db_transaction.price,
+                        -1,
+                    )
+                ],
+            )
         await session.commit()
         return dict(message="delete success")
     raise HTTPException(status_code=404, detail="Transaction not found")
@@ -1,17 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import select
 
 from typing import Annotated
 
 from .. import deps
 from .. import models
+from .. import refresh_tokens
+from .. import revocations
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/me")
-def get_me(current_user: models.User = Depends(deps.get_current_user)) -> models.User:
+def get_me(current_user: models.User = Depends(deps.get_current_full_user)) -> models.User:
     return current_user
 
 
@@ -31,6 +34,35 @@ async def get(
     return user
 
 
+async def check_registered(session: AsyncSession, user_info: models.RegisteredUser):
+    result = await session.exec(
+        select(models.DBUser.username)
+        .where(models.matches_login(user_info.username, user_info.email))
+        .limit(1)
+    )
+    username = result.first()
+
+    if username is None:
+        return
+    if username.lower() == user_info.username.lower():
+        detail = "This username already exists."
+    else:
+        detail = "This email already exists."
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+
+async def commit_registration(session: AsyncSession):
+    # the unique indexes catch a registration racing with the check above
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This username or email already exists.",
+        )
+
+
 @router.post("/register_merchant")
 async def register_merchant(
     user_info: models.RegisteredUser,
@@ -38,18 +70,7 @@ async def register_merchant(
     session: Annotated[AsyncSession, Depends(models.get_session)],
 ) -> models.Merchant:
 
-    # check username
-    user_result = await session.execute(
-        select(models.DBUser).where(models.DBUser.username == user_info.username)
-    )
-
-    user = user_result.scalar_one_or_none()
-
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="This username already exists.",
-        )
+    await check_registered(session, user_info)
 
     # create new user
     dbuser = models.DBUser.from_orm(user_info)
@@ -70,7 +91,7 @@ async def register_merchant(
     session.add(dbwallet)
     
 
-    await session.commit()
+    await commit_registration(session)
     
     await session.refresh(dbuser)
     await session.refresh(dbmerchant)
@@ -85,18 +106,7 @@ async def register_customer(
     session: Annotated[AsyncSession, Depends(models.get_session)],
 ) -> models.Customer:
 
-    # check username
-    user_result = await session.execute(
-        select(models.DBUser).where(models.DBUser.username == user_info.username)
-    )
-
-    user = user_result.scalar_one_or_none()
-
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="This username already exists.",
-        )
+    await check_registered(session, user_info)
 
     # create new user
     dbuser = models.DBUser.from_orm(user_info)
@@ -116,7 +126,7 @@ async def register_customer(
     dbwallet.user = dbuser
     session.add(dbwallet)
 
-    await session.commit()
+    await commit_registration(session)
     
     await session.refresh(dbuser)
     await session.refresh(dbcustomer)
@@ -153,8 +163,11 @@ async def change_password(
 
     await db_user.set_password(password_update.new_password)
     session.add(db_user)
+    await revocations.revoke_user(session, db_user.id)
+    await refresh_tokens.revoke_user_families(session, db_user.id)
     await session.commit()
     await session.refresh(db_user)
+    deps.invalidate_user(db_user.id)
     return db_user
 
 
@@ -187,8 +200,37 @@ async def update(
 
     await db_user.set_password(password_update.new_password)
     session.add(db_user)
+    await revocations.revoke_user(session, db_user.id)
+    await refresh_tokens.revoke_user_families(session, db_user.id)
+    await session.commit()
+    await session.refresh(db_user)
+    deps.invalidate_user(db_user.id)
+
+    return db_user
+
+
+@router.put("/{user_id}/status")
+async def update_status(
+    user_id: int,
+    status_update: models.UpdatedUserStatus,
+    session: Annotated[AsyncSession, Depends(models.get_session)],
+    current_user: models.User = Depends(deps.get_current_active_superuser),
+) -> models.User:
+    db_user = await session.get(models.DBUser, user_id)
+    if not db_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not found this user",
+        )
+
+    db_user.sqlmodel_update(status_update.model_dump(exclude_none=True))
+    session.add(db_user)
+    # tokens carry the old role and status, so they must not outlive them
+    await revocations.revoke_user(session, db_user.id)
+    await refresh_tokens.revoke_user_families(session, db_user.id)
     await session.commit()
     await session.refresh(db_user)
+    deps.invalidate_user(db_user.id)
 
     return db_user
 
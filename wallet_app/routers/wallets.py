@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 
 from typing import Optional, Annotated
-from sqlmodel import Field, SQLModel, create_engine, Session, select
+from sqlmodel import Field, SQLModel, create_engine, Session, select, delete
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..models import (
@@ -10,12 +10,18 @@ from ..models import (
     UpdatedWallet,
     WalletList,
     DBWallet,
+    DBWalletShard,
     User,
     engine,
     get_session,
+    get_read_session,
 )
 
+from .. import balances
 from .. import deps
+from .. import exports
+from .. import readers
+from ..responses import RowsResponse
 
 router = APIRouter(prefix="/wallets")
 
@@ -35,24 +41,29 @@ async def create_wallet(
     # return wallet.parse_obj(dbwallet.dict())
     return Wallet.from_orm(dbwallet)
 
-@router.get("")
+@router.get("", response_model=WalletList)
 async def read_wallets(
-    session: Annotated[AsyncSession, Depends(get_session)],
-    ) -> WalletList:
-    result = await session.exec(select(DBWallet))
-    if result:
-        wallets = result.all()
-        return WalletList.from_orm(dict(wallets=wallets, page_size=0, page=0, size_per_page=0))
-    raise HTTPException(status_code=404, detail="Wallet not found")
+    session: Annotated[AsyncSession, Depends(get_read_session)],
+    ) -> RowsResponse:
+    wallets = await readers.fetch_dicts(session, select(*balances.wallet_columns()))
+    return RowsResponse(dict(wallets=wallets, page_size=0, page=0, size_per_page=0))
+
+@router.get("/export")
+async def export_wallets(
+    format: exports.ExportFormat = "ndjson",
+    ):
+    return exports.export_response(
+        Wallet, DBWallet, format, "wallets", columns=balances.wallet_columns()
+    )
 
 @router.get("/{wallet_id}")
 async def read_wallet(
     wallet_id: int,
-    session: Annotated[AsyncSession, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_read_session)],
     ) -> Wallet:
 
     result = await session.exec(
-        select(DBWallet).where(DBWallet.id == wallet_id),
+        select(*balances.wallet_columns()).where(DBWallet.id == wallet_id),
     )
     dbwallet = result.one_or_none()
 
@@ -76,6 +87,10 @@ async def update_wallet(
     
     if dbwallet:
         print("update_wallet", wallet)
+        # the new balance replaces whatever is still held in shards
+        await session.exec(
+            delete(DBWalletShard).where(DBWalletShard.wallet_id == dbwallet.id)
+        )
         dbwallet.sqlmodel_update(wallet)
         session.add(dbwallet)
         await session.commit()
@@ -84,54 +99,31 @@ async def update_wallet(
     raise HTTPException(status_code=404, detail="Wallet not found")
 
 
-@router.put("add")
+@router.put("/add")
 async def add_balance(
     balance: UpdatedWallet,
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: User = Depends(deps.get_current_user),
     ) -> Wallet:
-    
-    
-    result = await session.exec(
-        select(DBWallet).where(DBWallet.user_id == current_user.id)
-    )
+    if balance.balance <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
 
-    dbwallet = result.one_or_none()
-    
-    balance.balance += dbwallet.balance
-    
-    
-    if dbwallet:
-        dbwallet.sqlmodel_update(balance)
-        session.add(dbwallet)
-        await session.commit()
-        await session.refresh(dbwallet)
-        return Wallet.from_orm(dbwallet)
-    raise HTTPException(status_code=404, detail="Wallet not found")
+    dbwallet = await balances.adjust(session, current_user.id, balance.balance)
+    await session.commit()
+    return Wallet.from_orm(dbwallet)
 
-@router.put("sub")
+@router.put("/sub")
 async def sub_balance(
     balance: UpdatedWallet,
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: User = Depends(deps.get_current_user),
     ) -> Wallet:
-    
-    
-    result = await session.exec(
-        select(DBWallet).where(DBWallet.user_id == current_user.id)
-    )
-    dbwallet = result.one_or_none()
-    
-    dbwallet.balance -= balance.balance
-    
-    
-    if dbwallet:
-        dbwallet.sqlmodel_update(balance)
-        session.add(dbwallet)
-        await session.commit()
-        await session.refresh(dbwallet)
-        return Wallet.from_orm(dbwallet)
-    raise HTTPException(status_code=404, detail="Wallet not found")
+    if balance.balance <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+
+    dbwallet = await balances.adjust(session, current_user.id, -balance.balance)
+    await session.commit()
+    return Wallet.from_orm(dbwallet)
 
 @router.delete("/{wallet_id}")
 async def delete_wallet(
@@ -145,6 +137,9 @@ async def delete_wallet(
     dbwallet = result.one_or_none()
 
     if dbwallet:
+        await session.exec(
+            delete(DBWalletShard).where(DBWalletShard.wallet_id == dbwallet.id)
+        )
         await session.delete(dbwallet)
         await session.commit()
         return dict(message="delete success")
@@ -0,0 +1,116 @@
+"""Item search over name and description.
+
+SQLite uses the items_fts FTS5 table ranked by bm25, PostgreSQL the GIN
+tsvector index ranked by ts_rank_cd. Every query word is matched as a
+prefix. Both expose a "rank" where lower is better, so results page with
+the usual (rank, id) keyset cursor.
+
+A short prefix of a common word can match most of the catalog, and
+ranking every match would make such queries as slow as a table scan.
+Only the newest SEARCH_CANDIDATES matches are ranked, and the list says
+truncated=True when there were more.
+"""
+import re
+
+from sqlalchemy import Float, cast, column, func, literal_column, select, table
+
+from . import config
+from . import models
+from . import pagination
+
+
+settings = config.get_settings()
+
+
+WORD = re.compile(r"\w+")
+
+items_fts = table("items_fts", column("rowid"))
+
+
+def words(q: str) -> list[str]:
+    return WORD.findall(q.lower())
+
+
+def _sqlite_matches(terms: list[str]):
+    query = " AND ".join(f'"{term}"*' for term in terms)
+    # name matches weigh ten times more than description matches
+    rank = func.bm25(literal_column("items_fts"), 10.0, 1.0)
+    return (
+        select(models.DBItem, rank.label("rank"))
+        .join(items_fts, items_fts.c.rowid == models.DBItem.id)
+        .where(literal_column("items_fts").op("MATCH")(query))
+        # FTS5 returns rowids in order, so the candidate limit stops the scan
+        .order_by(items_fts.c.rowid.desc())
+    )
+
+
+def _postgresql_matches(terms: list[str]):
+    # the vector is spelled out as in the index definition, or it goes unused
+    vector = literal_column(models.SEARCH_VECTOR)
+    query = func.to_tsquery(
+        literal_column("'simple'::regconfig"), " & ".join(f"{term}:*" for term in terms)
+    )
+    rank = -cast(func.ts_rank_cd(vector, query), Float)
+    return (
+        select(models.DBItem, rank.label("rank"))
+        .where(vector.op("@@")(query))
+        .order_by(models.DBItem.id.desc())
+    )
+
+
+def _matches(dialect: str, q: str, merchant_id: int | None):
+    terms = words(q)
+    if dialect == "sqlite":
+        matches = _sqlite_matches(terms)
+    else:
+        matches = _postgresql_matches(terms)
+
+    if merchant_id is not None:
+        matches = matches.where(models.DBItem.merchant_id == merchant_id)
+    return matches
+
+
+def statement(
+    dialect: str, q: str, merchant_id: int | None, cursor: str | None, limit: int
+):
+    matches = _matches(dialect, q, merchant_id).limit(settings.SEARCH_CANDIDATES)
+
+    ranked = matches.subquery("ranked")
+    return pagination.keyset(
+        select(ranked), ranked.c.rank, ranked.c.id, cursor, "rank", limit
+    )
+
+
+def truncated_statement(dialect: str, q: str, merchant_id: int | None):
+    """Selects a row only if more than SEARCH_CANDIDATES items match."""
+    return (
+        _matches(dialect, q, merchant_id)
+        .with_only_columns(models.DBItem.id)
+        .offset(settings.SEARCH_CANDIDATES)
+        .limit(1)
+    )
+
+
+async def search_items(
+    session, q: str, merchant_id: int | None, cursor: str | None, limit: int
+) -> models.ItemList:
+    rows = []
+    truncated = False
+    if words(q):
+        dialect = session.bind.dialect.name
+        result = await session.exec(
+            statement(dialect, q, merchant_id, cursor, limit)
+        )
+        rows = result.all()
+        result = await session.exec(truncated_statement(dialect, q, merchant_id))
+        truncated = result.first() is not None
+    items, next_cursor = pagination.next_cursor(rows, "rank", limit)
+
+    return models.ItemList.from_orm(
+        dict(
+            items=items,
+            size_per_page=limit,
+            next_cursor=next_cursor,
+            truncated=truncated,
+        )
+    )
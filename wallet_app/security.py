@@ -1,3 +1,5 @@
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Any, Union
 
@@ -20,6 +22,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     to_encode.update({"exp": expire})
+    to_encode.setdefault("iat", time.time())
+    to_encode.setdefault("jti", uuid.uuid4().hex)
 
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -28,11 +32,25 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.now() + expires_delta
+        expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.now() + timedelta(
+        expire = datetime.utcnow() + timedelta(
             minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
         )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "typ": "refresh"})
+    to_encode.setdefault("iat", time.time())
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+def user_claims(user, merchant_id=None, customer_id=None, wallet_id=None) -> dict:
+    """Access token claims for the stateless auth mode, without personal data."""
+    return {
+        "sub": str(user.id),
+        "role": user.role,
+        "status": user.status,
+        "merchant_id": merchant_id,
+        "customer_id": customer_id,
+        "wallet_id": wallet_id,
+    }